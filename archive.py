@@ -0,0 +1,70 @@
+import argparse
+import time
+from datetime import datetime
+from typing import List, Optional
+
+class ArchiveReport:
+    """Outcome of an archiving run"""
+
+    def __init__(self, returned_before: int):
+        self.returned_before = returned_before  # Epoch seconds
+        self.loans_archived = 0
+        self.batches = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        cutoff = datetime.fromtimestamp(self.returned_before).strftime("%Y-%m-%d %H:%M:%S")
+        return (f"Archived {self.loans_archived} loans returned before {cutoff} "
+                f"in {self.batches} batches ({self.elapsed:.2f}s)")
+
+def archive_loans(db, older_than_days: int = 365, batch_size: int = 1000,
+                  pause: float = 0.0) -> ArchiveReport:
+    """Move returned loans older than the given age into the history database
+
+    Each batch is its own short write transaction and the writer lock is
+    released in between (optionally sleeping ``pause`` seconds), so issues
+    and returns are not held up while a large backlog is archived.
+    """
+    if batch_size <= 0:
+        raise ValueError("Batch size must be positive")
+    if older_than_days < 0:
+        raise ValueError("Age must not be negative")
+
+    report = ArchiveReport(int(time.time()) - older_than_days * 86400)
+    start = time.perf_counter()
+
+    while True:
+        moved = db.archive_returned_loans(report.returned_before, batch_size)
+        if not moved:
+            break
+        report.loans_archived += moved
+        report.batches += 1
+        if pause:
+            time.sleep(pause)
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Archive returned loans into the history database")
+    parser.add_argument('--db', default='library.db', help="Database file (default: library.db)")
+    parser.add_argument('--older-than-days', type=int, default=365,
+                        help="Archive loans returned more than this many days ago (default: 365)")
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help="Loans moved per transaction (default: 1000)")
+    parser.add_argument('--pause', type=float, default=0.0,
+                        help="Seconds to sleep between batches (default: 0)")
+    args = parser.parse_args(argv)
+
+    from database import Database
+    db = Database(args.db, pooled=True)
+    try:
+        report = archive_loans(db, args.older_than_days, args.batch_size, args.pause)
+    finally:
+        db.close()
+
+    print(report.summary())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from database import Database
+
+class AsyncDatabase:
+    """Awaitable facade over a pooled Database for asyncio callers
+
+    Every public Database method is available as a coroutine, e.g.
+    ``await adb.search_books("tolkien")``. Calls run on a bounded pool of
+    worker threads and reads go through each thread's read-only reporting
+    connection, so the event loop never blocks on SQLite. At most
+    ``max_workers`` calls run at once; the rest wait in the event loop
+    where cancelling them is free.
+
+    The streaming ``iter_*`` methods are consumed on the worker and return
+    lists, since iterating them on the event loop would run their queries
+    there.
+
+    A call that is cancelled or exceeds its timeout while running a read is
+    interrupted on its connection. Writes are left to finish (and commit or
+    roll back) since they hold the shared writer.
+    """
+
+    def __init__(self, db_path: str = "library.db", max_workers: int = 4,
+                 timeout: Optional[float] = None, database: Optional[Database] = None,
+                 **options):
+        """Open a pooled Database, or wrap ``database`` if given
+
+        ``timeout`` is the default per-call timeout in seconds; ``options``
+        are passed on to Database().
+        """
+        if max_workers <= 0:
+            raise ValueError("max_workers must be positive")
+        self.db = database or Database(db_path, pooled=True, **options)
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='library-db')
+        self._slots = asyncio.Semaphore(max_workers)
+
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        method = getattr(self.db, name)
+        if not callable(method):
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            return await self.call(name, *args, **kwargs)
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+    async def call(self, name: str, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run a Database method on a worker thread and await its result
+
+        ``timeout`` overrides the default for this call. Raises
+        asyncio.TimeoutError when it expires.
+        """
+        method = getattr(self.db, name)
+        if timeout is None:
+            timeout = self.timeout
+        return await asyncio.wait_for(self._run(method, args, kwargs), timeout)
+
+    async def _run(self, method: Callable, args: tuple, kwargs: dict) -> Any:
+        async with self._slots:
+            call = _InterruptibleCall(self.db, method, args, kwargs)
+            future = asyncio.get_running_loop().run_in_executor(self.executor, call.run)
+            try:
+                return await future
+            except asyncio.CancelledError:
+                # A call still queued is dropped by the executor; stop one in flight
+                call.interrupt()
+                raise
+
+    async def close(self):
+        """Wait for running calls and close the database"""
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+        self.db.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+class _InterruptibleCall:
+    """One Database call that can be interrupted while it runs"""
+
+    def __init__(self, db: Database, method: Callable, args: tuple, kwargs: dict):
+        self.db = db
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.conn = None
+        self._lock = threading.Lock()
+
+    def run(self) -> Any:
+        # Writes share one connection; interrupting it could hit another call
+        if getattr(self.method, 'serialized_write', False):
+            return self.invoke()
+
+        # Reads run in their own snapshot on this thread's reporting connection
+        with self.db.report() as conn:
+            with self._lock:
+                self.conn = conn
+            try:
+                return self.invoke()
+            finally:
+                with self._lock:
+                    self.conn = None  # Never interrupt the next call on this thread
+
+    def invoke(self) -> Any:
+        result = self.method(*self.args, **self.kwargs)
+        # Drain iter_* generators here, on the worker and inside the snapshot
+        if isinstance(result, Iterator):
+            result = list(result)
+        return result
+
+    def interrupt(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.interrupt()
@@ -0,0 +1,224 @@
+import argparse
+import os
+import sqlite3
+import time
+from typing import Callable, List, Optional
+
+from connection_pool import read_only_uri
+
+# Called as progress(database, done, total); units are pages for online
+# backups and restores and bytes for compact snapshots
+ProgressCallback = Callable[[str, int, int], None]
+
+def history_path_for(path: str) -> str:
+    """History database stored next to a main database or backup file"""
+    return os.path.splitext(path)[0] + "_history.db"
+
+class BackupReport:
+    """Outcome of a backup, snapshot or restore"""
+
+    def __init__(self, destination: str):
+        self.destination = destination
+        self.files: List[str] = []
+        self.pages = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        return (f"Wrote {', '.join(self.files) or self.destination} "
+                f"({self.bytes / (1024 * 1024):.1f} MiB) in {self.elapsed:.2f}s")
+
+def _has_history(conn: sqlite3.Connection) -> bool:
+    return any(row[1] == 'history' for row in conn.execute('PRAGMA database_list'))
+
+def _replace(temp_path: str, path: str, report: BackupReport):
+    """Move a finished temporary file into place and record it"""
+    os.replace(temp_path, path)
+    report.files.append(path)
+    report.bytes += os.path.getsize(path)
+
+def _copy_pages(source: sqlite3.Connection, path: str, schema: str, pages: int,
+                pause: float, progress: Optional[ProgressCallback], report: BackupReport):
+    """Copy one attached database with the backup API into a temporary file"""
+    temp_path = path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    def step(status, remaining, total):
+        if progress:
+            progress(schema, total - remaining, total)
+        if pause and remaining:
+            time.sleep(pause)  # Runs between steps, outside any lock writers need
+
+    target = sqlite3.connect(temp_path)
+    try:
+        source.backup(target, pages=pages, progress=step, name=schema)
+        report.pages += target.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        target.close()
+    _replace(temp_path, path, report)
+
+def backup_database(db, destination: str, pages: int = 256, pause: float = 0.05,
+                    progress: Optional[ProgressCallback] = None) -> BackupReport:
+    """Copy the live database (and its history database) to ``destination``
+
+    Pages are copied ``pages`` at a time with ``pause`` seconds in between,
+    from a read-only connection holding one read transaction. In WAL mode
+    issues and returns keep committing throughout, and the copy is the
+    database as it was when the backup started. Files are written under a
+    temporary name and only moved into place once complete.
+    """
+    if pages <= 0:
+        raise ValueError("Pages per step must be positive")
+
+    report = BackupReport(destination)
+    start = time.perf_counter()
+
+    with db.report() as conn:
+        # Pin the snapshot of every file before the first step
+        conn.execute('SELECT COUNT(*) FROM main.sqlite_master').fetchone()
+        with_history = _has_history(conn)
+        if with_history:
+            conn.execute('SELECT COUNT(*) FROM history.sqlite_master').fetchone()
+
+        _copy_pages(conn, destination, 'main', pages, pause, progress, report)
+        if with_history:
+            _copy_pages(conn, history_path_for(destination), 'history',
+                        pages, pause, progress, report)
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+def snapshot_database(db, destination: str,
+                      progress: Optional[ProgressCallback] = None) -> BackupReport:
+    """Write a compacted copy of the database with VACUUM INTO
+
+    The snapshot has no free pages and freshly packed indexes, so it is
+    usually smaller than an online backup, at the cost of one long read
+    rather than many short steps. Progress is reported in bytes written
+    against the size of the live pages.
+    """
+    report = BackupReport(destination)
+    start = time.perf_counter()
+
+    # VACUUM cannot run inside report()'s transaction; use a fresh connection
+    conn = sqlite3.connect(read_only_uri(db.db_path), timeout=db.timeout, uri=True)
+    try:
+        conn.execute('ATTACH DATABASE ? AS history', (db.history_path,))
+        targets = [('main', destination), ('history', history_path_for(destination))]
+        for schema, path in targets:
+            temp_path = path + ".tmp"
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+            page_size = conn.execute(f'PRAGMA {schema}.page_size').fetchone()[0]
+            used_pages = (conn.execute(f'PRAGMA {schema}.page_count').fetchone()[0]
+                          - conn.execute(f'PRAGMA {schema}.freelist_count').fetchone()[0])
+            total = used_pages * page_size
+
+            def step(schema=schema, temp_path=temp_path, total=total):
+                if progress and os.path.exists(temp_path):
+                    progress(schema, min(os.path.getsize(temp_path), total), total)
+                return 0  # Keep going
+
+            conn.set_progress_handler(step, 100000)
+            try:
+                conn.execute(f'VACUUM {schema} INTO ?', (temp_path,))
+            finally:
+                conn.set_progress_handler(None, 0)
+            if progress:
+                progress(schema, total, total)
+            report.pages += used_pages
+            _replace(temp_path, path, report)
+    finally:
+        conn.close()
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+def restore_database(source: str, db_path: str = "library.db", pages: int = 1024,
+                     progress: Optional[ProgressCallback] = None) -> BackupReport:
+    """Overwrite ``db_path`` (and its history database) with a backup
+
+    The backup is integrity-checked first. Stop the application before
+    restoring: running instances keep serving cached lookups from before.
+    """
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Backup not found: {source}")
+
+    report = BackupReport(db_path)
+    start = time.perf_counter()
+
+    restores = [(source, db_path)]
+    if os.path.exists(history_path_for(source)):
+        restores.append((history_path_for(source), history_path_for(db_path)))
+
+    for backup_path, path in restores:
+        conn = sqlite3.connect(read_only_uri(backup_path), uri=True)
+        try:
+            check = conn.execute('PRAGMA quick_check').fetchone()[0]
+            if check != 'ok':
+                raise Exception(f"Backup {backup_path} failed integrity check: {check}")
+
+            def step(status, remaining, total, name=os.path.basename(path)):
+                if progress:
+                    progress(name, total - remaining, total)
+
+            target = sqlite3.connect(path, timeout=20)
+            try:
+                conn.backup(target, pages=pages, progress=step)
+                report.pages += target.execute('PRAGMA page_count').fetchone()[0]
+            finally:
+                target.close()
+        finally:
+            conn.close()
+        report.files.append(path)
+        report.bytes += os.path.getsize(path)
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+def print_progress(database: str, done: int, total: int):
+    """Progress callback printing a percentage per database"""
+    percent = 100 * done / total if total else 100
+    print(f"\r  {database}: {percent:5.1f}%", end='\n' if done >= total else '', flush=True)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Back up or restore the library database")
+    parser.add_argument('--db', default='library.db', help="Database file (default: library.db)")
+    parser.add_argument('--quiet', action='store_true', help="Do not print progress")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    backup = commands.add_parser('backup', help="Online backup while the library stays in use")
+    backup.add_argument('destination', help="Backup file to write")
+    backup.add_argument('--pages', type=int, default=256,
+                        help="Pages copied per step (default: 256)")
+    backup.add_argument('--pause', type=float, default=0.05,
+                        help="Seconds to pause between steps (default: 0.05)")
+
+    snapshot = commands.add_parser('snapshot', help="Compacted copy made with VACUUM INTO")
+    snapshot.add_argument('destination', help="Snapshot file to write")
+
+    restore = commands.add_parser('restore', help="Replace the database with a backup")
+    restore.add_argument('source', help="Backup or snapshot file to restore")
+    args = parser.parse_args(argv)
+
+    progress = None if args.quiet else print_progress
+    if args.command == 'restore':
+        report = restore_database(args.source, args.db, progress=progress)
+    else:
+        from database import Database
+        db = Database(args.db, pooled=True)
+        try:
+            if args.command == 'backup':
+                report = backup_database(db, args.destination, args.pages, args.pause, progress)
+            else:
+                report = snapshot_database(db, args.destination, progress)
+        finally:
+            db.close()
+
+    print(report.summary())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+class LRUCache:
+    """Bounded, thread-safe LRU cache with write invalidation
+
+    Readers take a ``generation()`` token before querying the database and
+    hand it back to ``put()``. Any invalidation in between bumps the
+    generation and the possibly stale value is dropped instead of cached.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """``maxsize`` of 0 disables caching; ``ttl`` is in seconds"""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        """Token to pass to put() for a value read after this call"""
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, generation: int):
+        """Cache a value unless the cache was invalidated since ``generation``"""
+        if self.maxsize <= 0 or value is None:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys: Hashable):
+        """Drop the given keys"""
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,178 @@
+import argparse
+import csv
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from forms import BookForm
+
+# Header aliases accepted in import files, mapped to BookForm field names
+FIELD_ALIASES = {
+    'title': 'title',
+    'author': 'author',
+    'category': 'category',
+    'isbn': 'isbn',
+    'year': 'year',
+    'publication_year': 'year',
+    'description': 'description'
+}
+
+class ImportReport:
+    """Outcome of a catalog import"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rejects: List[Tuple[int, Dict[str, str]]] = []  # (line number, errors)
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        """Import throughput over the whole run"""
+        return self.rows_imported / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        return (f"{self.path}: read {self.rows_read} rows, imported {self.rows_imported}, "
+                f"rejected {len(self.rejects)} in {self.elapsed:.2f}s "
+                f"({self.rows_per_second:.0f} rows/s)")
+
+def iter_csv_records(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (line number, record) pairs from a CSV file with a header row"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        for record in reader:
+            yield reader.line_num, record
+
+def iter_jsonl_records(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (line number, record) pairs from a JSON Lines file
+
+    Lines that are not JSON objects are yielded as None so they can be
+    reported as rejects.
+    """
+    with open(path, encoding='utf-8') as f:
+        for line_num, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield line_num, record if isinstance(record, dict) else None
+
+def iter_records(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield records from a CSV or JSONL file based on its extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return iter_csv_records(path)
+    if extension in ('.jsonl', '.ndjson'):
+        return iter_jsonl_records(path)
+    raise ValueError(f"Unsupported import file type: {extension or path}")
+
+def normalize_record(record: Dict[str, Any]) -> Dict[str, str]:
+    """Map header aliases to form fields and strip surrounding whitespace"""
+    fields = {}
+    for key, value in record.items():
+        field = FIELD_ALIASES.get(str(key).strip().lower())
+        if field:
+            fields[field] = '' if value is None else str(value).strip()
+    return fields
+
+def iter_valid_batches(records: Iterator[Tuple[int, Dict[str, Any]]],
+                       report: ImportReport,
+                       batch_size: int) -> Iterator[List[Tuple[str, str, str, str, int, str]]]:
+    """Validate records with BookForm and yield database rows in batches
+
+    Invalid records are added to the report's rejects instead of stopping
+    the load. So are repeats of an ISBN already seen in this file; the
+    first occurrence wins.
+    """
+    form = BookForm()
+    batch = []
+    seen_isbns: Dict[str, int] = {}  # ISBN -> line it was first read from
+
+    for line_num, record in records:
+        report.rows_read += 1
+        if record is None:
+            report.rejects.append((line_num, {'row': "Row is not a JSON object"}))
+            continue
+
+        fields = normalize_record(record)
+        if not form.validate(
+            fields.get('title', ''),
+            fields.get('author', ''),
+            fields.get('category', ''),
+            fields.get('isbn', ''),
+            fields.get('year', ''),
+            fields.get('description', '')
+        ):
+            report.rejects.append((line_num, dict(form.errors)))
+            continue
+
+        first_line = seen_isbns.setdefault(fields['isbn'], line_num)
+        if first_line != line_num:
+            report.rejects.append((line_num, {'isbn': f"Duplicate ISBN; first seen on line {first_line}"}))
+            continue
+
+        batch.append((
+            fields['title'],
+            fields['author'],
+            fields['category'],
+            fields['isbn'],
+            int(fields['year']),
+            fields.get('description', '')
+        ))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+def import_catalog(db, path: str, batch_size: int = 5000) -> ImportReport:
+    """Stream books from a CSV/JSONL file into the catalog
+
+    Rows are validated with BookForm and upserted by ISBN in batches inside
+    a single transaction, so the import either lands completely or not at
+    all. Rejected rows are reported without aborting the load. The writer
+    runs with the "bulk-load" tuning profile for the duration of the load.
+    """
+    if batch_size <= 0:
+        raise ValueError("Batch size must be positive")
+
+    report = ImportReport(path)
+    start = time.perf_counter()
+    batches = iter_valid_batches(iter_records(path), report, batch_size)
+    with db.tuning('bulk-load'):
+        report.rows_imported = db.upsert_books(batches)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk import books into the library catalog")
+    parser.add_argument('path', help="CSV (with header row) or JSONL file of books")
+    parser.add_argument('--db', default='library.db', help="Database file (default: library.db)")
+    parser.add_argument('--batch-size', type=int, default=5000,
+                        help="Rows written per executemany call (default: 5000)")
+    parser.add_argument('--max-rejects', type=int, default=20,
+                        help="Number of rejected rows to print (default: 20)")
+    args = parser.parse_args(argv)
+
+    from database import Database
+    db = Database(args.db)
+    try:
+        report = import_catalog(db, args.path, args.batch_size)
+    finally:
+        db.close()
+
+    print(report.summary())
+    for line_num, errors in report.rejects[:args.max_rejects]:
+        details = "; ".join(f"{field}: {error}" for field, error in errors.items())
+        print(f"  line {line_num}: {details}")
+    if len(report.rejects) > args.max_rejects:
+        print(f"  ... {len(report.rejects) - args.max_rejects} more rejected rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import threading
+from typing import Callable, List, Optional
+from urllib.parse import quote
+
+def read_only_uri(db_path: str) -> str:
+    """SQLite URI opening the database file in read-only mode"""
+    return f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+
+class ConnectionPool:
+    """Per-thread SQLite connections with a single shared writer.
+
+    Every thread gets its own read connection while all writes go through one
+    writer connection. The database is switched to WAL journaling so readers
+    keep working against the last committed snapshot while a write is in
+    progress instead of queueing behind it. Reporting connections are opened
+    with ``mode=ro`` so long-running reports can never take a write lock.
+    """
+
+    def __init__(self, db_path: str, timeout: float = 20,
+                 on_connect: Optional[Callable[[sqlite3.Connection], None]] = None,
+                 factory: type = sqlite3.Connection):
+        """Open the writer connection and enable WAL journaling
+
+        ``on_connect`` is called with every new connection before it is used
+        and ``factory`` is the connection class passed to sqlite3.connect().
+        """
+        self.db_path = db_path
+        self.timeout = timeout  # busy timeout in seconds
+        self.on_connect = on_connect
+        self.factory = factory
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        self.writer = self._connect()
+        self.journal_mode = self.writer.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+
+    def _connect(self, read_only: bool = False, report: bool = False) -> sqlite3.Connection:
+        """Open a new connection and register it with the pool"""
+        conn = sqlite3.connect(
+            read_only_uri(self.db_path) if report else self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,  # Closed from whichever thread calls close()
+            factory=self.factory,
+            uri=report
+        )
+        conn.row_factory = sqlite3.Row
+        if self.on_connect:
+            self.on_connect(conn)
+        if read_only:
+            # Guard against accidental writes through a reader
+            conn.execute('PRAGMA query_only = ON')
+
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """Get the read connection owned by the calling thread"""
+        conn = getattr(self._local, 'reader', None)
+        if conn is None:
+            conn = self._connect(read_only=True)
+            self._local.reader = conn
+        return conn
+
+    def reporter(self) -> sqlite3.Connection:
+        """Get the read-only reporting connection owned by the calling thread"""
+        conn = getattr(self._local, 'reporter', None)
+        if conn is None:
+            # mode=ro covers only the main file; query_only also guards ATTACHed ones
+            conn = self._connect(read_only=True, report=True)
+            self._local.reporter = conn
+        return conn
+
+    def close(self):
+        """Close every connection opened by the pool"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                print(f"Error closing pooled connection: {str(e)}")
@@ -1,15 +1,247 @@
 import sqlite3
 import os
+import re
 import hashlib
 import time
-from datetime import datetime, timedelta
-from typing import Optional, Tuple, List, Dict, Any
+import threading
+import functools
+import contextlib
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple, List, Dict, Any, Iterable, Iterator, Callable
+
+from cache import LRUCache
+from connection_pool import ConnectionPool, read_only_uri
+from instrumentation import QueryStats, NullTracker, InstrumentedConnection
+from migrations import run_migrations, BOOKS_FTS_INSERT_TRIGGER, BOOKS_FTS_UPDATE_TRIGGER
+from tuning import PROFILES, resolve_profile, apply_settings, set_journal_mode, current_settings
+
+# Queries made only of ISBN characters are also matched against books.isbn
+ISBN_QUERY_PATTERN = re.compile(r'^[0-9Xx][0-9Xx\- ]{2,}$')
+
+# Sort orders accepted by the paginated listings, mapped to their columns
+BOOK_SORT_COLUMNS = {
+    'title': 'title',
+    'author': 'author',
+    'category': 'category',
+    'year': 'publication_year',
+    'id': 'id'
+}
+
+USER_SORT_COLUMNS = {
+    'username': 'username',
+    'email': 'email',
+    'role': 'role',
+    'id': 'id'
+}
+
+LOAN_SORT_COLUMNS = {
+    'issue_date': 'ib.issue_date',
+    'due_date': 'ib.due_date',
+    'id': 'ib.id'
+}
+
+# Same sort orders over active_loans, used when listing open loans only
+OPEN_LOAN_SORT_COLUMNS = {
+    'issue_date': 'al.issue_date',
+    'due_date': 'al.due_date',
+    'id': 'al.issue_id'
+}
+
+# Values bound per query when expanding large IN (...) lists
+IN_CLAUSE_CHUNK_SIZE = 500
+
+# Loan dates are epoch seconds; this is "now" in the same units
+SQL_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+# Length of a loan
+LOAN_PERIOD_DAYS = 30
+SECONDS_PER_DAY = 86400
+
+# Rows fetched per fetchmany() call by the streaming iter_* methods
+ITER_CHUNK_SIZE = 1000
+
+# Overdue notices are sent once per calendar week (local time, from Monday),
+# so all of a member's overdue loans come due together. A loan's first
+# notice counts for the week OVERDUE_NOTICE_MIN_GAP_DAYS after its due date,
+# so a loan due late in the week is not nagged again a day later.
+OVERDUE_NOTICE_PERIOD_DAYS = 7
+OVERDUE_NOTICE_MIN_GAP_DAYS = 3
+NOTICE_WEEK_START = date(2000, 1, 3)  # A Monday; overdue periods count weeks from here
+
+# Notification outbox delivery: how long a claimed notice is reserved for
+# its sender, and how failed sends are retried (exponential backoff)
+OUTBOX_LEASE_SECONDS = 300
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE_SECONDS = 60
+OUTBOX_RETRY_MAX_SECONDS = 6 * 3600
+
+# Queries shared by the list methods and their streaming iter_* variants
+AVAILABLE_BOOKS_QUERY = '''
+    SELECT * FROM books 
+    WHERE available = TRUE
+    ORDER BY title
+'''
+
+ALL_BOOKS_QUERY = '''
+    SELECT id, title, author, category, isbn, publication_year, available
+    FROM books
+    ORDER BY title
+'''
+
+ALL_USERS_QUERY = '''
+    SELECT id, username, email, role, roll_number
+    FROM users
+    ORDER BY username
+'''
+
+OVERDUE_BOOKS_QUERY = f'''
+    SELECT 
+        b.id, b.title, b.author,
+        u.username, u.email,
+        ib.issue_date, ib.due_date,
+        ({SQL_NOW} - ib.due_date) / {float(SECONDS_PER_DAY)} as days_overdue
+    FROM issued_books ib
+    JOIN books b ON ib.book_id = b.id
+    JOIN users u ON ib.user_id = u.id
+    WHERE ib.return_date IS NULL
+    AND ib.due_date < {SQL_NOW}
+    ORDER BY ib.due_date
+'''
+
+USER_ISSUED_BOOKS_QUERY = f'''
+    SELECT 
+        b.*,
+        ib.issue_date,
+        ib.due_date,
+        CASE 
+            WHEN ib.due_date < {SQL_NOW} THEN 1
+            ELSE 0
+        END as is_overdue
+    FROM issued_books ib
+    JOIN books b ON ib.book_id = b.id
+    WHERE ib.user_id = ? AND ib.return_date IS NULL
+    ORDER BY ib.issue_date DESC
+'''
+
+USER_OVERDUE_BOOKS_QUERY = f'''
+    SELECT 
+        b.*,
+        ib.issue_date,
+        ib.due_date,
+        ({SQL_NOW} - ib.due_date) / {float(SECONDS_PER_DAY)} as days_overdue
+    FROM issued_books ib
+    JOIN books b ON ib.book_id = b.id
+    WHERE ib.user_id = ? 
+    AND ib.return_date IS NULL
+    AND ib.due_date < {SQL_NOW}
+    ORDER BY ib.due_date
+'''
+
+# Open loans needing a notice, with everything the email templates use:
+# overdue ones and those due in [due_from, due_until). One range scan of
+# the active_loans due_date index, in due date order. days_overdue counts
+# local calendar days, at least 1 once overdue, since notices go out at
+# midnight rather than a whole number of days after the due time.
+# Params: now, now, now, due_until, now, due_from
+REMINDER_LOANS_QUERY = f'''
+    SELECT 
+        al.issue_id, al.book_id, al.user_id,
+        b.title,
+        u.username, u.email,
+        al.due_date,
+        CASE WHEN al.due_date < ? THEN 'overdue' ELSE 'due' END as notice,
+        MAX(CAST(julianday(?, 'unixepoch', 'localtime', 'start of day')
+                 - julianday(al.due_date, 'unixepoch', 'localtime', 'start of day') AS INTEGER),
+            CASE WHEN al.due_date < ? THEN 1 ELSE 0 END) as days_overdue
+    FROM active_loans al
+    JOIN books b ON b.id = al.book_id
+    JOIN users u ON u.id = al.user_id
+    WHERE al.due_date < ?
+    AND (al.due_date < ? OR al.due_date >= ?)
+    ORDER BY al.due_date
+'''
+
+def overdue_notice_period(due_date: int, now: int) -> int:
+    """Overdue notice period (calendar week number) a loan is in at ``now``"""
+    day = datetime.fromtimestamp(max(now, due_date + OVERDUE_NOTICE_MIN_GAP_DAYS * SECONDS_PER_DAY)).date()
+    return (day - NOTICE_WEEK_START).days // OVERDUE_NOTICE_PERIOD_DAYS
+
+@functools.lru_cache(maxsize=128)
+def record_type(columns: Tuple[str, ...]) -> type:
+    """Named tuple class for rows with the given column names"""
+    # rename=True turns duplicate or invalid names (e.g. from b.*) into _N
+    return namedtuple('Record', columns, rename=True)
+
+# Helpers that do not touch the database and are left out of instrumentation
+UNINSTRUMENTED_METHODS = {'reader', 'report', 'tuning', 'track', 'dump_stats', 'cache_stats', 'close', 'hash_password',
+                          'add_loan_listener', 'remove_loan_listener'}
+
+def serialized_write(method):
+    """Run a Database method while holding the writer lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.write_lock:
+            return method(self, *args, **kwargs)
+    wrapper.serialized_write = True
+    return wrapper
+
+def reporting(method):
+    """Run a Database read in its own report() snapshot"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.report():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class Database:
-    def __init__(self, db_path: str = "library.db"):
-        """Initialize database connection with retry mechanism"""
+    def __init__(self, db_path: str = "library.db", pooled: bool = False,
+                 timeout: float = 20, instrument: Optional[bool] = None,
+                 slow_query_ms: Optional[float] = None,
+                 cache_size: int = 1024, cache_ttl: Optional[float] = 60,
+                 history_path: Optional[str] = None, profile: Optional[str] = None):
+        """Initialize database connection with retry mechanism
+
+        With ``pooled=True`` every thread reads through its own connection
+        and writes are serialized through a single WAL-mode writer, so reads
+        never wait for an in-progress write. ``timeout`` is the SQLite busy
+        timeout in seconds.
+
+        With ``instrument=True`` (or LIBRARY_DB_INSTRUMENT=1) every public
+        method and SQL statement is timed into ``self.stats`` and statements
+        slower than ``slow_query_ms`` (or LIBRARY_DB_SLOW_QUERY_MS, default
+        100) are logged with their query plan.
+
+        Book and user lookups are served from an LRU cache of ``cache_size``
+        entries that writes invalidate on commit; ``cache_ttl`` bounds how
+        long derived values such as overdue counts may lag the clock.
+
+        Archived loans live in ``history_path`` (default: ``<name>_history.db``
+        next to the database), attached to every connection as ``history``.
+        
+        ``profile`` names the SQLite tuning profile from tuning.PROFILES
+        applied to every connection (or LIBRARY_DB_PROFILE, default
+        "desktop"); "kiosk-readonly" refuses writes once the schema is set up.
+        """
         self.db_path = db_path
+        self.history_path = history_path or os.path.splitext(db_path)[0] + "_history.db"
         self.conn = None
+        self.pool = None
+        self.timeout = timeout
+        self.fts_enabled = False
+        self.stats = None
+        self.cache = LRUCache(cache_size, cache_ttl)
+        if instrument is None:
+            instrument = os.environ.get('LIBRARY_DB_INSTRUMENT', '') not in ('', '0')
+        if instrument:
+            if slow_query_ms is None:
+                slow_query_ms = float(os.environ.get('LIBRARY_DB_SLOW_QUERY_MS', 100))
+            self.stats = QueryStats(slow_query_ms)
+        self.write_lock = threading.RLock()
+        self._local = threading.local()
+        self._report_connections = []  # Reporting connections when not pooled
+        self._loan_listeners: List[Callable[[str, List[Tuple[int, Optional[int]]]], None]] = []
+        self.profile = resolve_profile(profile)
         self.max_retries = 3
         self.retry_delay = 1  # seconds
         
@@ -19,14 +251,26 @@ class Database:
         # Try to connect with retries
         for attempt in range(self.max_retries):
             try:
-                self.conn = sqlite3.connect(
-                    db_path,
-                    timeout=20,  # 20 second timeout
-                    check_same_thread=False  # Allow multi-threading
-                )
-                self.conn.row_factory = sqlite3.Row  # Enable row factory
+                factory = InstrumentedConnection if self.stats else sqlite3.Connection
+                if pooled:
+                    self.pool = ConnectionPool(db_path, timeout=timeout,
+                                               on_connect=self._configure_connection,
+                                               factory=factory)
+                    self.conn = self.pool.writer
+                else:
+                    self.conn = sqlite3.connect(
+                        db_path,
+                        timeout=timeout,
+                        check_same_thread=False,  # Allow multi-threading
+                        factory=factory
+                    )
+                    self.conn.row_factory = sqlite3.Row  # Enable row factory
+                    self._configure_connection(self.conn)
+                set_journal_mode(self.conn, PROFILES[self.profile]['journal_mode'])
                 self.create_tables()
                 self.create_default_admin()  # Create default admin if needed
+                if PROFILES[self.profile].get('query_only'):
+                    self.conn.execute('PRAGMA query_only = ON')
                 print(f"Database connected successfully on attempt {attempt + 1}")
                 break
             except sqlite3.OperationalError as e:
@@ -36,71 +280,198 @@ class Database:
                 else:
                     raise Exception(f"Failed to connect to database: {str(e)}")
     
+        if self.stats:
+            self._instrument_methods()
+    
     def __del__(self):
         """Cleanup database connection"""
-        if self.conn:
+        self.close()
+    
+    def _configure_connection(self, conn: sqlite3.Connection):
+        """Prepare a newly opened connection"""
+        if self.stats:
+            conn.attach(self.stats)
+        apply_settings(conn, PROFILES[self.profile])
+        conn.execute('ATTACH DATABASE ? AS history', (self.history_path,))
+    
+    def _instrument_methods(self):
+        """Record latency and row counts for every public method"""
+        for name in dir(type(self)):
+            if name.startswith('_') or name in UNINSTRUMENTED_METHODS:
+                continue
+            if name.startswith('iter_'):
+                continue  # Generators return before running any query
+            method = getattr(self, name)
+            if callable(method):
+                setattr(self, name, self.stats.wrap(name, method))
+    
+    def track(self, name: str):
+        """Time a block of raw queries as the named operation
+        
+        Usable as ``with db.track('gui.login') as call: ...``; set
+        ``call.rows`` to record rows returned. Does nothing unless
+        instrumentation is enabled.
+        """
+        if self.stats:
+            return self.stats.track(name)
+        return NullTracker()
+    
+    def dump_stats(self, path: Optional[str] = None) -> Optional[str]:
+        """Log a latency report and return all statistics as JSON"""
+        if not self.stats:
+            return None
+        print(self.stats.format_report())
+        cache = self.cache_stats()
+        print(f"Lookup cache: {cache['hits']} hits, {cache['misses']} misses "
+              f"({cache['hit_rate']:.0%}), {cache['size']}/{cache['maxsize']} entries")
+        return self.stats.dump(path)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the book and user lookup cache"""
+        return self.cache.stats()
+    
+    def close(self):
+        """Close the database connection(s)"""
+        if self.pool:
+            self.pool.close()
+        elif self.conn:
             try:
                 self.conn.close()
             except Exception as e:
                 print(f"Error closing database connection: {str(e)}")
+        for conn in self._report_connections:
+            try:
+                conn.close()
+            except Exception as e:
+                print(f"Error closing reporting connection: {str(e)}")
+        self._report_connections = []
+        self.conn = None
+        self.pool = None
     
+    @contextlib.contextmanager
+    def tuning(self, profile: str):
+        """Run the enclosed writes with another tuning profile on the writer
+        
+        Meant for ``with db.tuning('bulk-load'): ...`` around imports. Other
+        writers wait until the block ends, then the writer's previous
+        settings are restored and, if checkpoints were held back, the WAL is
+        checkpointed. Readers keep their own settings throughout.
+        """
+        settings = PROFILES[resolve_profile(profile)]
+        with self.write_lock:
+            previous = current_settings(self.conn)
+            try:
+                apply_settings(self.conn, settings)
+                if settings['journal_mode']:
+                    set_journal_mode(self.conn, settings['journal_mode'])
+                yield self.conn
+            finally:
+                if settings['journal_mode']:
+                    set_journal_mode(self.conn, previous['journal_mode'])
+                apply_settings(self.conn, previous)
+                if previous['journal_mode'] == 'wal' and settings['wal_autocheckpoint'] == 0:
+                    self.conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+    
+    def add_loan_listener(self, listener: Callable[[str, List[Tuple[int, Optional[int]]]], None]):
+        """Call ``listener(event, loans)`` after loans are issued or returned
+        
+        ``event`` is 'issue' or 'return' and ``loans`` lists (issue_id,
+        due_date) pairs, due_date being None for returns. Listeners run on
+        the writing thread after commit and must be quick.
+        """
+        self._loan_listeners.append(listener)
+    
+    def remove_loan_listener(self, listener: Callable[[str, List[Tuple[int, Optional[int]]]], None]):
+        """Stop calling a listener added with add_loan_listener()"""
+        if listener in self._loan_listeners:
+            self._loan_listeners.remove(listener)
+    
+    def _notify_loan_listeners(self, event: str, loans: List[Tuple[int, Optional[int]]]):
+        if not loans:
+            return
+        for listener in list(self._loan_listeners):
+            try:
+                listener(event, loans)
+            except Exception as e:
+                print(f"Error in loan listener: {str(e)}")
+    
+    def _book_cache_keys(self, book_id: int) -> List[Tuple[str, int]]:
+        """Cache keys holding data about a book"""
+        return [('book', book_id), ('book_details', book_id)]
+    
+    def reader(self) -> sqlite3.Connection:
+        """Get the connection read-only queries should use on this thread"""
+        report = getattr(self._local, 'report', None)
+        if report is not None:
+            return report
+        if self.pool:
+            return self.pool.reader()
+        return self.conn
+    
+    def _report_connection(self) -> sqlite3.Connection:
+        """Get this thread's read-only (mode=ro) reporting connection"""
+        if self.pool:
+            return self.pool.reporter()
+        
+        conn = getattr(self._local, 'report_conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                read_only_uri(self.db_path),
+                timeout=self.timeout,
+                check_same_thread=False,
+                factory=InstrumentedConnection if self.stats else sqlite3.Connection,
+                uri=True
+            )
+            conn.row_factory = sqlite3.Row
+            self._configure_connection(conn)
+            # mode=ro covers only the main file; query_only also guards history
+            conn.execute('PRAGMA query_only = ON')
+            self._local.report_conn = conn
+            self._report_connections.append(conn)
+        return conn
+    
+    @contextlib.contextmanager
+    def report(self):
+        """Run the enclosed reads on a read-only connection in one snapshot
+        
+        Every Database read made on this thread inside the block goes
+        through a ``mode=ro`` connection within a single read transaction,
+        so related queries agree with each other. In WAL mode (pooled=True)
+        issues and returns keep committing while the report runs. Nested
+        blocks share the outer snapshot.
+        """
+        conn = getattr(self._local, 'report', None)
+        if conn is not None:
+            yield conn
+            return
+        
+        conn = self._report_connection()
+        conn.execute('BEGIN')
+        self._local.report = conn
+        try:
+            yield conn
+        finally:
+            self._local.report = None
+            conn.rollback()  # Nothing to commit; just release the snapshot
+    
+    @serialized_write
     def create_tables(self):
-        """Create necessary tables if they don't exist"""
+        """Bring the schema up to date by applying pending migrations"""
         try:
-            cursor = self.conn.cursor()
-            
-            # Create users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    email TEXT UNIQUE NOT NULL,
-                    password TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    roll_number TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create books table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS books (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    author TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    isbn TEXT UNIQUE NOT NULL,
-                    publication_year INTEGER NOT NULL,
-                    description TEXT,
-                    available BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create issued_books table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS issued_books (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    book_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    issue_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    due_date TIMESTAMP NOT NULL,
-                    return_date TIMESTAMP,
-                    FOREIGN KEY (book_id) REFERENCES books (id),
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-            
-            self.conn.commit()
-            print("Database tables created successfully")
+            version = run_migrations(self.conn)
+            self.fts_enabled = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'"
+            ).fetchone() is not None
+            print(f"Database schema at version {version}")
         except Exception as e:
-            print(f"Error creating tables: {str(e)}")
+            print(f"Error migrating database schema: {str(e)}")
             raise
     
     def hash_password(self, password: str) -> str:
         """Hash password using SHA-256"""
         return hashlib.sha256(password.encode()).hexdigest()
     
+    @serialized_write
     def add_user(self, username: str, email: str, password: str, role: str, roll_number: str = None) -> bool:
         """Add a new user to the database"""
         try:
@@ -136,7 +507,7 @@ class Database:
     def verify_user(self, username: str, password: str, role: str) -> Optional[Tuple[Dict[str, Any], str]]:
         """Verify user credentials and return user data and role"""
         try:
-            cursor = self.conn.cursor()
+            cursor = self.reader().cursor()
             hashed_password = self.hash_password(password)
             
             cursor.execute('''
@@ -152,6 +523,7 @@ class Database:
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
     
+    @serialized_write
     def add_book(self, title: str, author: str, category: str, isbn: str,
                  publication_year: int, description: str = "") -> bool:
         """Add a new book to the database"""
@@ -176,222 +548,775 @@ class Database:
             self.conn.rollback()
             raise Exception(f"Database error: {str(e)}")
     
-    def issue_book(self, book_id: int, user_id: int) -> bool:
-        """Issue a book to a user"""
+    @serialized_write
+    def upsert_books(self, batches: Iterable[List[Tuple[str, str, str, str, int, str]]]) -> int:
+        """Insert or update books from batches of rows in a single transaction
+        
+        Each row is (title, author, category, isbn, publication_year,
+        description); an existing book with the same ISBN is updated in place.
+        Batches are consumed lazily, so callers can stream rows from a file.
+        Nothing is committed unless every batch is written. A repeated ISBN
+        updates the row written earlier in the same load; the last one wins.
+        """
         try:
             cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            # Index new rows in one pass after the load instead of per row;
+            # the DDL is part of the transaction and rolls back with it
+            if self.fts_enabled:
+                cursor.execute('SELECT COALESCE(MAX(id), 0) FROM books')
+                last_existing_id = cursor.fetchone()[0]
+                cursor.execute('DROP TRIGGER IF EXISTS books_fts_insert')
+                # Rows added by this load are not indexed yet, so updates to
+                # them (a repeated ISBN) must not touch the index either
+                cursor.execute('DROP TRIGGER IF EXISTS books_fts_update')
+                cursor.execute(BOOKS_FTS_UPDATE_TRIGGER.replace(
+                    'BEGIN', f'WHEN OLD.id <= {int(last_existing_id)}\n    BEGIN', 1))
+            
+            written = 0
+            for batch in batches:
+                cursor.executemany('''
+                    INSERT INTO books (title, author, category, isbn, publication_year, description)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (isbn) DO UPDATE SET
+                        title = excluded.title,
+                        author = excluded.author,
+                        category = excluded.category,
+                        publication_year = excluded.publication_year,
+                        description = excluded.description
+                ''', batch)
+                written += len(batch)
+            
+            if self.fts_enabled:
+                cursor.execute('''
+                    INSERT INTO books_fts (rowid, title, author, category, description)
+                    SELECT id, title, author, category, description
+                    FROM books
+                    WHERE id > ?
+                ''', (last_existing_id,))
+                cursor.execute(BOOKS_FTS_INSERT_TRIGGER)
+                cursor.execute('DROP TRIGGER books_fts_update')
+                cursor.execute(BOOKS_FTS_UPDATE_TRIGGER)
             
-            # Check if book is available
-            cursor.execute('SELECT available FROM books WHERE id = ?', (book_id,))
-            book = cursor.fetchone()
-            if not book or not book['available']:
-                return False
+            self.conn.commit()
+            self.cache.clear()
+            return written
             
-            # Check if user already has this book
+        except Exception as e:
+            self.conn.rollback()
+            raise Exception(f"Failed to import books: {str(e)}")
+    
+    @serialized_write
+    def issue_book(self, book_id: int, user_id: int) -> bool:
+        """Issue a book to a user
+        
+        The availability flag is claimed with a conditional UPDATE inside a
+        BEGIN IMMEDIATE transaction; the affected-row count decides the
+        outcome, so two desks issuing the same copy cannot both succeed.
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            # Claim the copy only if it is still available
             cursor.execute('''
-                SELECT * FROM issued_books 
-                WHERE book_id = ? AND user_id = ? AND return_date IS NULL
-            ''', (book_id, user_id))
-            if cursor.fetchone():
+                UPDATE books 
+                SET available = FALSE 
+                WHERE id = ? AND available = TRUE
+            ''', (book_id,))
+            if cursor.rowcount != 1:
+                self.conn.rollback()
                 return False
             
             # Issue the book
+            now = int(time.time())
+            due = now + LOAN_PERIOD_DAYS * SECONDS_PER_DAY
             cursor.execute('''
                 INSERT INTO issued_books (book_id, user_id, issue_date, due_date)
-                VALUES (?, ?, datetime('now'), datetime('now', '+30 days'))
-            ''', (book_id, user_id))
-            
-            # Update book availability
-            cursor.execute('''
-                UPDATE books 
-                SET available = FALSE 
+                SELECT ?, id, ?, ?
+                FROM users
                 WHERE id = ?
-            ''', (book_id,))
+            ''', (book_id, now, due, user_id))
+            if cursor.rowcount != 1:
+                # Unknown user; release the claim
+                self.conn.rollback()
+                return False
+            issue_id = cursor.lastrowid
             
             self.conn.commit()
+            self.cache.invalidate(*self._book_cache_keys(book_id), ('user_details', user_id))
+            self._notify_loan_listeners('issue', [(issue_id, due)])
             return True
         except Exception as e:
             print(f"Error issuing book: {str(e)}")
             self.conn.rollback()
             return False
     
+    @serialized_write
     def return_book(self, issue_id: int) -> bool:
-        """Return a book"""
+        """Return a book
+        
+        Only an open loan can be closed, so returning the same loan twice
+        (e.g. from two desks) fails instead of re-stamping the return date.
+        """
         try:
             cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
             
-            # Get book ID
-            cursor.execute('SELECT book_id FROM issued_books WHERE id = ?', (issue_id,))
-            result = cursor.fetchone()
-            if not result:
-                return False
-            
-            book_id = result['book_id']
-            
-            # Update issued_books
+            # Close the loan if it is still open
             cursor.execute('''
                 UPDATE issued_books 
-                SET return_date = datetime('now')
-                WHERE id = ?
-            ''', (issue_id,))
-            
-            # Update book availability
-            cursor.execute('''
-                UPDATE books 
-                SET available = TRUE 
-                WHERE id = ?
-            ''', (book_id,))
+                SET return_date = ?
+                WHERE id = ? AND return_date IS NULL
+                RETURNING book_id, user_id
+            ''', (int(time.time()), issue_id))
+            loan = cursor.fetchone()
+            if loan is None:
+                self.conn.rollback()
+                return False
             
+            # The active_loans triggers release the book
             self.conn.commit()
+            self.cache.invalidate(*self._book_cache_keys(loan['book_id']),
+                                  ('user_details', loan['user_id']))
+            self._notify_loan_listeners('return', [(issue_id, None)])
             return True
         except Exception as e:
             print(f"Error returning book: {str(e)}")
             self.conn.rollback()
             return False
     
+    def _select_in(self, cursor: sqlite3.Cursor, query: str,
+                   values: List[Any]) -> List[sqlite3.Row]:
+        """Run a query with an ``IN ({placeholders})`` clause over many values
+        
+        Values are sent in chunks that stay under SQLite's bound-parameter limit.
+        """
+        rows = []
+        for start in range(0, len(values), IN_CLAUSE_CHUNK_SIZE):
+            chunk = values[start:start + IN_CLAUSE_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(query.format(placeholders=placeholders), chunk)
+            rows.extend(cursor.fetchall())
+        return rows
+    
+    @serialized_write
+    def issue_books_batch(self, loans: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """Issue many books in one transaction
+        
+        ``loans`` is a list of (book_id, user_id) pairs. Books and users are
+        validated with set-based queries, every valid loan is written in the
+        same transaction, and one outcome dict per pair is returned in input
+        order with ``success`` and ``issue_id``, or on failure ``error``.
+        """
+        outcomes = [{'book_id': book_id, 'user_id': user_id, 'issue_id': None,
+                     'success': False, 'error': None}
+                    for book_id, user_id in loans]
+        if not loans:
+            return outcomes
+        
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            book_ids = list({book_id for book_id, _ in loans})
+            user_ids = list({user_id for _, user_id in loans})
+            available = {
+                row['id']: bool(row['available'])
+                for row in self._select_in(
+                    cursor, 'SELECT id, available FROM books WHERE id IN ({placeholders})', book_ids)
+            }
+            existing_users = {
+                row['id']
+                for row in self._select_in(
+                    cursor, 'SELECT id FROM users WHERE id IN ({placeholders})', user_ids)
+            }
+            
+            accepted = []
+            claimed = set()
+            for outcome in outcomes:
+                book_id, user_id = outcome['book_id'], outcome['user_id']
+                if book_id not in available:
+                    outcome['error'] = "Book not found"
+                elif user_id not in existing_users:
+                    outcome['error'] = "User not found"
+                elif not available[book_id] or book_id in claimed:
+                    outcome['error'] = "Book not available"
+                else:
+                    claimed.add(book_id)
+                    accepted.append(outcome)
+            
+            now = int(time.time())
+            due = now + LOAN_PERIOD_DAYS * SECONDS_PER_DAY
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'issued_books'")
+            row = cursor.fetchone()
+            last_id = row[0] if row else 0
+            cursor.executemany('''
+                INSERT INTO issued_books (book_id, user_id, issue_date, due_date)
+                VALUES (?, ?, ?, ?)
+            ''', [(outcome['book_id'], outcome['user_id'], now, due) for outcome in accepted])
+            
+            # New loan ids follow the AUTOINCREMENT mark; each book got one loan
+            cursor.execute('SELECT id, book_id FROM issued_books WHERE id > ?', (last_id,))
+            issue_ids = {row['book_id']: row['id'] for row in cursor.fetchall()}
+            
+            self.conn.commit()
+            stale = []
+            for outcome in accepted:
+                outcome['success'] = True
+                outcome['issue_id'] = issue_ids.get(outcome['book_id'])
+                stale.extend(self._book_cache_keys(outcome['book_id']))
+                stale.append(('user_details', outcome['user_id']))
+            self.cache.invalidate(*stale)
+            self._notify_loan_listeners('issue', [(outcome['issue_id'], due) for outcome in accepted])
+            return outcomes
+            
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise Exception(f"Failed to issue books: {str(e)}")
+    
+    @serialized_write
+    def return_books_batch(self, issue_ids: List[int]) -> List[Dict[str, Any]]:
+        """Return many books in one transaction
+        
+        Returns one outcome dict per issue ID in input order with ``success``
+        and, on failure, ``error``. Loans that are unknown or already
+        returned are reported without affecting the rest of the batch.
+        """
+        outcomes = [{'issue_id': issue_id, 'success': False, 'error': None}
+                    for issue_id in issue_ids]
+        if not issue_ids:
+            return outcomes
+        
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            loans = {
+                row['id']: row
+                for row in self._select_in(
+                    cursor,
+                    'SELECT id, book_id, user_id, return_date FROM issued_books WHERE id IN ({placeholders})',
+                    list(set(issue_ids)))
+            }
+            
+            accepted = []
+            claimed = set()
+            for outcome in outcomes:
+                loan = loans.get(outcome['issue_id'])
+                if loan is None:
+                    outcome['error'] = "Loan not found"
+                elif loan['return_date'] is not None or loan['id'] in claimed:
+                    outcome['error'] = "Book already returned"
+                else:
+                    claimed.add(loan['id'])
+                    accepted.append((outcome, loan))
+            
+            now = int(time.time())
+            cursor.executemany('''
+                UPDATE issued_books 
+                SET return_date = ?
+                WHERE id = ?
+            ''', [(now, outcome['issue_id']) for outcome, _ in accepted])
+            
+            self.conn.commit()
+            stale = []
+            for outcome, loan in accepted:
+                outcome['success'] = True
+                stale.extend(self._book_cache_keys(loan['book_id']))
+                stale.append(('user_details', loan['user_id']))
+            self.cache.invalidate(*stale)
+            self._notify_loan_listeners('return', [(outcome['issue_id'], None) for outcome, _ in accepted])
+            return outcomes
+            
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise Exception(f"Failed to return books: {str(e)}")
+    
     def get_available_books(self) -> List[Dict[str, Any]]:
         """Get all available books"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT * FROM books 
-                WHERE available = TRUE
-                ORDER BY title
-            ''')
+            cursor = self.reader().cursor()
+            cursor.execute(AVAILABLE_BOOKS_QUERY)
             return cursor.fetchall()
         except Exception as e:
             print(f"Error getting available books: {str(e)}")
             return []
     
+    @reporting
     def get_overdue_books(self) -> List[Dict[str, Any]]:
         """Get all overdue books"""
         try:
-            cursor = self.conn.cursor()
+            cursor = self.reader().cursor()
             
-            cursor.execute('''
-                SELECT 
-                    b.id, b.title, b.author,
-                    u.username, u.email,
-                    ib.issue_date, ib.due_date,
-                    julianday('now') - julianday(ib.due_date) as days_overdue
-                FROM issued_books ib
-                JOIN books b ON ib.book_id = b.id
-                JOIN users u ON ib.user_id = u.id
-                WHERE ib.return_date IS NULL
-                AND ib.due_date < datetime('now')
-                ORDER BY ib.due_date
-            ''')
+            cursor.execute(OVERDUE_BOOKS_QUERY)
             
             return [dict(row) for row in cursor.fetchall()]
             
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
     
-    def get_user_books(self, user_id: int) -> List[Dict[str, Any]]:
-        """Get all books issued to a user"""
+    def get_user_books(self, user_id: int, include_history: bool = False) -> List[Dict[str, Any]]:
+        """Get all books issued to a user
+        
+        Loans moved to the history database by the archiver are only
+        included with ``include_history=True``.
+        """
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT 
-                    ib.id as issue_id,
-                    b.*,
-                    ib.issue_date,
-                    ib.return_date
-                FROM issued_books ib
-                JOIN books b ON ib.book_id = b.id
-                WHERE ib.user_id = ?
-                ORDER BY ib.issue_date DESC
-            ''', (user_id,))
+            cursor = self.reader().cursor()
+            cursor.execute(*self._user_books_query(cursor, user_id, include_history))
             return cursor.fetchall()
         except Exception as e:
             print(f"Error getting user books: {str(e)}")
             return []
     
-    def search_books(self, query: str) -> List[Dict[str, Any]]:
-        """Search books by title, author, or ISBN"""
+    def _user_books_query(self, cursor: sqlite3.Cursor, user_id: int,
+                          include_history: bool) -> Tuple[str, List[Any]]:
+        """Build the get_user_books() query and its parameters"""
+        loans = "SELECT id, book_id, issue_date, return_date FROM issued_books WHERE user_id = ?"
+        params = [user_id]
+        if include_history:
+            for table in self._history_tables(cursor):
+                loans += f'''
+                    UNION ALL
+                    SELECT id, book_id, issue_date, return_date FROM history.{table}
+                    WHERE user_id = ?
+                '''
+                params.append(user_id)
+        
+        query = f'''
+            SELECT 
+                ib.id as issue_id,
+                b.*,
+                ib.issue_date,
+                ib.return_date
+            FROM ({loans}) ib
+            JOIN books b ON ib.book_id = b.id
+            ORDER BY ib.issue_date DESC
+        '''
+        return query, params
+    
+    def _history_tables(self, cursor: sqlite3.Cursor) -> List[str]:
+        """Names of the per-year loan tables in the history database"""
+        cursor.execute('''
+            SELECT name FROM history.sqlite_master
+            WHERE type = 'table' AND name GLOB 'loans_[0-9][0-9][0-9][0-9]'
+            ORDER BY name DESC
+        ''')
+        return [row['name'] for row in cursor.fetchall()]
+    
+    def _debit_archived_loans(self, cursor: sqlite3.Cursor, column: str, value: int):
+        """Take a user's or book's archived loans back out of borrowers' lifetime totals
+        
+        archive_returned_loans() credits user_loan_stats for every loan it
+        moves; this undoes that before the loans are purged from history.
+        """
+        archived_per_user: Dict[int, int] = {}
+        for table in self._history_tables(cursor):
+            cursor.execute(f'''
+                SELECT user_id, COUNT(*) as count FROM history.{table}
+                WHERE {column} = ?
+                GROUP BY user_id
+            ''', (value,))
+            for row in cursor.fetchall():
+                archived_per_user[row['user_id']] = archived_per_user.get(row['user_id'], 0) + row['count']
+        
+        cursor.executemany('''
+            UPDATE user_loan_stats
+            SET total_issued = MAX(total_issued - ?, 0)
+            WHERE user_id = ?
+        ''', [(count, user_id) for user_id, count in archived_per_user.items()])
+    
+    def _purge_history(self, cursor: sqlite3.Cursor, column: str, value: int):
+        """Delete a user's or book's archived loans from every history table
+        
+        Committed on its own after the main-side delete, since a transaction
+        spanning main and history is not atomic; if a crash leaves archived
+        loans behind, repeating the delete removes them.
+        """
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            for table in self._history_tables(cursor):
+                cursor.execute(f'DELETE FROM history.{table} WHERE {column} = ?', (value,))
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+    
+    @serialized_write
+    def archive_returned_loans(self, returned_before: int, batch_size: int = 1000) -> int:
+        """Move one batch of loans returned before a cut-off into the history database
+        
+        ``returned_before`` is in epoch seconds.
+        Loans go to history.loans_<issue year>, created on demand. SQLite does
+        not commit a transaction spanning main and history atomically in WAL
+        mode, so the copy is committed to history first and the loans are
+        deleted from main in a second transaction. Copies are keyed by loan
+        id, so a batch interrupted between the two is simply redone.
+        Returns the number of loans moved; 0 means nothing is left to move.
+        """
         try:
             cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
             
             cursor.execute('''
-                SELECT * FROM books
-                WHERE title LIKE ? OR author LIKE ? OR isbn LIKE ?
-                ORDER BY title
-            ''', (f'%{query}%', f'%{query}%', f'%{query}%'))
+                SELECT id, CAST(strftime('%Y', issue_date, 'unixepoch') AS INTEGER) as year
+                FROM issued_books
+                WHERE return_date IS NOT NULL AND return_date < ?
+                ORDER BY return_date
+                LIMIT ?
+            ''', (returned_before, batch_size))
+            loans = cursor.fetchall()
+            if not loans:
+                self.conn.rollback()
+                return 0
+            
+            by_year: Dict[int, List[Tuple[int]]] = {}
+            for loan in loans:
+                by_year.setdefault(loan['year'] or 0, []).append((loan['id'],))
+            
+            for year, ids in by_year.items():
+                table = f"loans_{year:04d}"
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS history.{table} (
+                        id INTEGER PRIMARY KEY,
+                        book_id INTEGER NOT NULL,
+                        user_id INTEGER NOT NULL,
+                        issue_date INTEGER,
+                        due_date INTEGER NOT NULL,
+                        return_date INTEGER
+                    )
+                ''')
+                cursor.execute(f'''
+                    CREATE INDEX IF NOT EXISTS history.idx_{table}_user
+                    ON {table} (user_id, issue_date)
+                ''')
+                cursor.executemany(f'''
+                    INSERT OR IGNORE INTO history.{table}
+                        (id, book_id, user_id, issue_date, due_date, return_date)
+                    SELECT id, book_id, user_id, issue_date, due_date, return_date
+                    FROM issued_books
+                    WHERE id = ?
+                ''', ids)
             
-            return [dict(row) for row in cursor.fetchall()]
+            # Only history is written above, so this commit is durable on its own
+            self.conn.commit()
+            
+            cursor.execute('BEGIN IMMEDIATE')
+            archived_per_user: Dict[int, int] = {}
+            moved = 0
+            for loan in loans:
+                cursor.execute('DELETE FROM issued_books WHERE id = ? RETURNING user_id', (loan['id'],))
+                row = cursor.fetchone()
+                if row is None:
+                    continue  # Already removed by another writer
+                archived_per_user[row['user_id']] = archived_per_user.get(row['user_id'], 0) + 1
+                moved += 1
+            
+            # Archived loans still count towards a user's lifetime total
+            cursor.executemany('''
+                UPDATE user_loan_stats
+                SET total_issued = total_issued + ?
+                WHERE user_id = ?
+            ''', [(count, user_id) for user_id, count in archived_per_user.items()])
+            
+            self.conn.commit()
+            return moved
+            
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise Exception(f"Failed to archive loans: {str(e)}")
+    
+    @reporting
+    def search_books(self, query: str, available_only: bool = False,
+                     limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """Search books by title, author, category, description or ISBN
+
+        Every word in the query must match the start of a token, so partial
+        input such as "harr pot" finds "Harry Potter". Results are ranked by
+        BM25 relevance, with exact ISBN prefix matches first.
+        """
+        try:
+            terms = re.findall(r'\w+', query)
+            if not terms:
+                # No search terms: the first ``limit`` books by title, limited in SQL
+                sql, params = self._filter_books_query(None, True if available_only else None, None)
+                cursor = self.reader().cursor()
+                cursor.execute(sql + " LIMIT ?", params + [limit or -1])
+                return [dict(row) for row in cursor.fetchall()]
+            
+            if not self.fts_enabled:
+                return self._search_books_like(query, available_only, limit)
+            
+            cursor = self.reader().cursor()
+            availability = "AND b.available = TRUE" if available_only else ""
+            results = []
+            seen = set()
+            
+            # ISBN lookups use the unique index on books.isbn as a prefix range
+            if ISBN_QUERY_PATTERN.match(query.strip()):
+                prefix = query.strip()
+                cursor.execute(f'''
+                    SELECT b.* FROM books b
+                    WHERE b.isbn >= ? AND b.isbn < ? {availability}
+                    ORDER BY b.isbn
+                    LIMIT ?
+                ''', (prefix, prefix + '\uffff', limit or -1))
+                for row in cursor.fetchall():
+                    results.append(dict(row))
+                    seen.add(row['id'])
+            
+            # Quote each term so FTS5 operators in user input are taken literally
+            match = ' '.join(f'"{term}"*' for term in terms)
+            cursor.execute(f'''
+                SELECT b.* FROM books_fts
+                JOIN books b ON b.id = books_fts.rowid
+                WHERE books_fts MATCH ? {availability}
+                ORDER BY books_fts.rank
+                LIMIT ?
+            ''', (match, limit or -1))
+            for row in cursor.fetchall():
+                if row['id'] not in seen:
+                    results.append(dict(row))
+            
+            return results[:limit] if limit else results
             
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
     
+    def _search_books_like(self, query: str, available_only: bool,
+                           limit: Optional[int]) -> List[Dict[str, Any]]:
+        """Substring search used when the FTS5 index is unavailable"""
+        cursor = self.reader().cursor()
+        availability = "AND available = TRUE" if available_only else ""
+        cursor.execute(f'''
+            SELECT * FROM books
+            WHERE (title LIKE ? OR author LIKE ? OR category LIKE ? OR isbn LIKE ?)
+            {availability}
+            ORDER BY title
+            LIMIT ?
+        ''', (f'%{query}%', f'%{query}%', f'%{query}%', f'%{query}%', limit or -1))
+        return [dict(row) for row in cursor.fetchall()]
+    
     def get_book_details(self, book_id: int) -> Optional[Dict[str, Any]]:
         """Get detailed information about a book"""
+        key = ('book_details', book_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        generation = self.cache.generation()
         try:
-            cursor = self.conn.cursor()
+            cursor = self.reader().cursor()
             
             cursor.execute('''
                 SELECT 
                     b.*,
                     u.username as current_holder,
-                    ib.issue_date,
-                    ib.due_date
+                    al.issue_date,
+                    al.due_date
                 FROM books b
-                LEFT JOIN issued_books ib ON b.id = ib.book_id AND ib.return_date IS NULL
-                LEFT JOIN users u ON ib.user_id = u.id
+                LEFT JOIN active_loans al ON b.id = al.book_id
+                LEFT JOIN users u ON al.user_id = u.id
                 WHERE b.id = ?
             ''', (book_id,))
             
             result = cursor.fetchone()
-            return dict(result) if result else None
+            if not result:
+                return None
+            self.cache.put(key, dict(result), generation)
+            return dict(result)
             
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
     
     def get_user_details(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get detailed information about a user"""
+        key = ('user_details', user_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        generation = self.cache.generation()
         try:
-            cursor = self.conn.cursor()
+            cursor = self.reader().cursor()
             
             cursor.execute('''
                 SELECT 
                     u.*,
-                    COUNT(DISTINCT ib.id) as total_books_issued,
-                    COUNT(DISTINCT CASE WHEN ib.return_date IS NULL THEN ib.id END) as current_books,
-                    COUNT(DISTINCT CASE WHEN ib.return_date IS NULL AND ib.due_date < datetime('now') THEN ib.id END) as overdue_books
+                    COALESCE(s.total_issued, 0) as total_books_issued,
+                    COALESCE(s.current_books, 0) as current_books,
+                    COALESCE(s.overdue_books, 0) + (
+                        -- Loans that fell due since the last overdue sweep
+                        SELECT COUNT(*) FROM active_loans al
+                        WHERE al.user_id = u.id
+                        AND al.due_date >= (SELECT value FROM library_stats
+                                            WHERE name = 'overdue_as_of')
+                        AND al.due_date < ?
+                    ) as overdue_books
                 FROM users u
-                LEFT JOIN issued_books ib ON u.id = ib.user_id
+                LEFT JOIN user_loan_stats s ON u.id = s.user_id
                 WHERE u.id = ?
-                GROUP BY u.id
-            ''', (user_id,))
+            ''', (int(time.time()), user_id))
             
             result = cursor.fetchone()
-            return dict(result) if result else None
+            if not result:
+                return None
+            self.cache.put(key, dict(result), generation)
+            return dict(result)
             
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
     
+    @reporting
     def filter_books(self, category: Optional[str] = None,
                     available: Optional[bool] = None,
                     year: Optional[int] = None) -> List[Dict[str, Any]]:
         """Filter books by category, availability, and year"""
         try:
-            cursor = self.conn.cursor()
+            cursor = self.reader().cursor()
+            cursor.execute(*self._filter_books_query(category, available, year))
+            return [dict(row) for row in cursor.fetchall()]
             
-            query = "SELECT * FROM books WHERE 1=1"
-            params = []
+        except sqlite3.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    def _filter_books_query(self, category: Optional[str], available: Optional[bool],
+                            year: Optional[int]) -> Tuple[str, List[Any]]:
+        """Build the filter_books() query and its parameters"""
+        query = "SELECT * FROM books WHERE 1=1"
+        params = []
+        
+        if category:
+            query += " AND category = ?"
+            params.append(category)
+        
+        if available is not None:
+            query += " AND available = ?"
+            params.append(available)
+        
+        if year:
+            query += " AND publication_year = ?"
+            params.append(year)
+        
+        query += " ORDER BY title"
+        return query, params
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get dashboard statistics from the trigger-maintained counters
+        
+        Returns total_books, available_books, total_users, users_by_role,
+        open_loans and overdue_loans without scanning the tables. Loans that
+        fell due since the last refresh_overdue_stats() sweep are counted
+        from the open-loans due_date index.
+        """
+        try:
+            cursor = self.reader().cursor()
             
-            if category:
-                query += " AND category = ?"
-                params.append(category)
+            cursor.execute('SELECT name, value FROM library_stats')
+            counters = {row['name']: row['value'] for row in cursor.fetchall()}
             
-            if available is not None:
-                query += " AND available = ?"
-                params.append(available)
+            cursor.execute('''
+                SELECT COUNT(*) FROM issued_books
+                WHERE return_date IS NULL
+                AND due_date >= ? AND due_date < ?
+            ''', (counters.get('overdue_as_of', 0), int(time.time())))
+            newly_overdue = cursor.fetchone()[0]
+            
+            return {
+                'total_books': counters.get('total_books', 0),
+                'available_books': counters.get('available_books', 0),
+                'total_users': counters.get('total_users', 0),
+                'users_by_role': {
+                    name.split(':', 1)[1]: value
+                    for name, value in counters.items()
+                    if name.startswith('users:') and value
+                },
+                'open_loans': counters.get('open_loans', 0),
+                'overdue_loans': counters.get('overdue_loans', 0) + newly_overdue
+            }
             
-            if year:
-                query += " AND publication_year = ?"
-                params.append(year)
+        except sqlite3.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    @serialized_write
+    def refresh_overdue_stats(self) -> int:
+        """Fold loans that fell due since the last sweep into the overdue counters
+        
+        Updates library_stats and user_loan_stats, keeping the range that
+        get_stats() and get_user_details() count at read time short. Returns
+        the number of loans that became overdue.
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            now = int(time.time())
+            
+            cursor.execute('''
+                SELECT COUNT(*) FROM issued_books
+                WHERE return_date IS NULL
+                AND due_date >= (SELECT value FROM library_stats WHERE name = 'overdue_as_of')
+                AND due_date < ?
+            ''', (now,))
+            newly_overdue = cursor.fetchone()[0]
+            
+            cursor.execute('''
+                UPDATE library_stats SET value = value + ? WHERE name = 'overdue_loans'
+            ''', (newly_overdue,))
+            cursor.execute('''
+                UPDATE user_loan_stats
+                SET overdue_books = overdue_books + due.count
+                FROM (
+                    SELECT user_id, COUNT(*) as count
+                    FROM active_loans
+                    WHERE due_date >= (SELECT value FROM library_stats WHERE name = 'overdue_as_of')
+                    AND due_date < ?
+                    GROUP BY user_id
+                ) as due
+                WHERE user_loan_stats.user_id = due.user_id
+            ''', (now,))
+            cursor.execute('''
+                UPDATE library_stats SET value = ? WHERE name = 'overdue_as_of'
+            ''', (now,))
+            
+            self.conn.commit()
+            return newly_overdue
             
-            query += " ORDER BY title"
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise Exception(f"Database error: {str(e)}")
+    
+    @reporting
+    def get_changes_since(self, seq: int = 0, limit: int = 1000,
+                          tables: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Get changes to books, users and loans made after sequence number ``seq``
+        
+        Each change has seq, table_name, row_id, operation ('insert',
+        'update' or 'delete') and changed_at. Poll with the last seq seen,
+        starting from get_change_seq() taken with the initial load, and
+        re-read only the rows named. Raises if changes after ``seq`` have
+        already been pruned, in which case the caller must reload in full.
+        """
+        try:
+            cursor = self.reader().cursor()
+            
+            cursor.execute("SELECT value FROM library_stats WHERE name = 'changes_pruned_through'")
+            row = cursor.fetchone()
+            pruned_through = row[0] if row else 0
+            if seq < pruned_through:
+                raise Exception(f"Changes up to {pruned_through} were pruned; reload from the tables")
+            
+            query = '''
+                SELECT seq, table_name, row_id, operation, changed_at
+                FROM changes
+                WHERE seq > ?
+            '''
+            params = [seq]
+            if tables is not None:
+                tables = list(tables)
+                query += f" AND table_name IN ({','.join('?' * len(tables))})"
+                params.extend(tables)
+            query += ' ORDER BY seq LIMIT ?'
+            params.append(limit)
             
             cursor.execute(query, params)
             return [dict(row) for row in cursor.fetchall()]
@@ -399,14 +1324,237 @@ class Database:
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
     
+    def get_change_seq(self) -> int:
+        """Get the sequence number of the latest change"""
+        try:
+            cursor = self.reader().cursor()
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'")
+            row = cursor.fetchone()
+            return row[0] if row else 0
+            
+        except sqlite3.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    @serialized_write
+    def prune_changes(self, older_than_days: int = 30) -> int:
+        """Delete changes older than the given age and return how many went"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            cursor.execute('''
+                SELECT MAX(seq) FROM changes WHERE changed_at < ?
+            ''', (int(time.time()) - older_than_days * SECONDS_PER_DAY,))
+            last_seq = cursor.fetchone()[0]
+            if last_seq is None:
+                self.conn.rollback()
+                return 0
+            
+            cursor.execute('DELETE FROM changes WHERE seq <= ?', (last_seq,))
+            deleted = cursor.rowcount
+            cursor.execute('''
+                UPDATE library_stats SET value = ? WHERE name = 'changes_pruned_through'
+            ''', (last_seq,))
+            
+            self.conn.commit()
+            return deleted
+            
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise Exception(f"Database error: {str(e)}")
+    
+    @serialized_write
+    def enqueue_notifications(self, due_from: int, due_until: int,
+                              now: Optional[int] = None) -> int:
+        """Queue reminders for loans due in [due_from, due_until) and overdue notices
+        
+        Each loan gets one due reminder and one overdue notice per calendar
+        week (see overdue_notice_period); notices already queued or sent are
+        left alone, so sweeps can run as often as they like. Returns the
+        number of notices added.
+        """
+        if now is None:
+            now = int(time.time())
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            # WHERE true keeps ON CONFLICT from being parsed as a join clause
+            cursor.execute(f'''
+                INSERT INTO notification_outbox
+                    (issue_id, notice, period, user_id, email, title, due_date, days_overdue,
+                     next_attempt_at)
+                SELECT 
+                    issue_id, notice,
+                    CASE WHEN notice = 'overdue'
+                        THEN CAST(julianday(MAX(?, due_date + {OVERDUE_NOTICE_MIN_GAP_DAYS * SECONDS_PER_DAY}),
+                                            'unixepoch', 'localtime', 'start of day')
+                                  - julianday('{NOTICE_WEEK_START.isoformat()}') AS INTEGER)
+                             / {OVERDUE_NOTICE_PERIOD_DAYS}
+                        ELSE 0 END,
+                    user_id, email, title, due_date, days_overdue,
+                    ?
+                FROM ({REMINDER_LOANS_QUERY})
+                WHERE true
+                ON CONFLICT (issue_id, notice, period) DO NOTHING
+            ''', (now, now, now, now, now, due_until, now, due_from))
+            queued = cursor.rowcount
+            
+            self.conn.commit()
+            return queued
+            
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise Exception(f"Database error: {str(e)}")
+    
+    @serialized_write
+    def claim_notifications(self, limit: int = 100, lease_seconds: int = OUTBOX_LEASE_SECONDS,
+                            max_attempts: int = OUTBOX_MAX_ATTEMPTS, per_user: bool = False,
+                            now: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Reserve up to ``limit`` notices that are ready to send
+        
+        Claimed notices are 'sending' for ``lease_seconds``; report the
+        outcome with complete_notifications(). A claim that lapses (the
+        sender died) makes the notice claimable again, so concurrent or
+        restarted senders never send one notice twice unless a send was
+        cut off mid-way. Notices for loans returned meanwhile are cancelled.
+        
+        With ``per_user=True`` every ready notice of up to ``limit`` users is
+        claimed, so each user's notices can be sent as one digest.
+        """
+        if now is None:
+            now = int(time.time())
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            cursor.execute('''
+                UPDATE notification_outbox SET status = 'cancelled'
+                WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+                AND issue_id NOT IN (SELECT issue_id FROM active_loans)
+            ''', (now,))
+            cursor.execute('''
+                UPDATE notification_outbox
+                SET status = 'failed', last_error = COALESCE(last_error, 'Send did not complete')
+                WHERE status = 'sending' AND next_attempt_at <= ? AND attempts >= ?
+            ''', (now, max_attempts))
+            
+            ready = "status IN ('pending', 'sending') AND next_attempt_at <= ?"
+            if per_user:
+                claimable = f'''
+                    SELECT id FROM notification_outbox
+                    WHERE {ready} AND user_id IN (
+                        SELECT user_id FROM notification_outbox
+                        WHERE {ready}
+                        GROUP BY user_id
+                        ORDER BY MIN(next_attempt_at)
+                        LIMIT ?
+                    )
+                '''
+                params = (now + lease_seconds, now, now, limit)
+            else:
+                claimable = f'''
+                    SELECT id FROM notification_outbox
+                    WHERE {ready}
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                '''
+                params = (now + lease_seconds, now, limit)
+            
+            cursor.execute(f'''
+                UPDATE notification_outbox
+                SET status = 'sending', attempts = attempts + 1, next_attempt_at = ?
+                WHERE id IN ({claimable})
+                RETURNING id, issue_id, notice, period, user_id, email, title,
+                          due_date, days_overdue, attempts
+            ''', params)
+            claimed = [dict(row) for row in cursor.fetchall()]
+            
+            self.conn.commit()
+            return sorted(claimed, key=lambda notice: notice['id'])
+            
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise Exception(f"Database error: {str(e)}")
+    
+    @serialized_write
+    def complete_notifications(self, results: Iterable[Tuple[int, Optional[str]]],
+                               max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                               now: Optional[int] = None):
+        """Record send outcomes as (notice id, error or None) pairs
+        
+        Failed notices are retried after OUTBOX_RETRY_BASE_SECONDS, doubling
+        per attempt up to OUTBOX_RETRY_MAX_SECONDS, and given up on after
+        ``max_attempts``.
+        """
+        if now is None:
+            now = int(time.time())
+        results = list(results)
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            cursor.executemany('''
+                UPDATE notification_outbox
+                SET status = 'sent', sent_at = ?, last_error = NULL
+                WHERE id = ? AND status = 'sending'
+            ''', [(now, notice_id) for notice_id, error in results if error is None])
+            cursor.executemany(f'''
+                UPDATE notification_outbox
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    last_error = ?,
+                    next_attempt_at = ? + MIN({OUTBOX_RETRY_BASE_SECONDS} << (attempts - 1),
+                                              {OUTBOX_RETRY_MAX_SECONDS})
+                WHERE id = ? AND status = 'sending'
+            ''', [(max_attempts, error, now, notice_id)
+                  for notice_id, error in results if error is not None])
+            
+            self.conn.commit()
+            
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise Exception(f"Database error: {str(e)}")
+    
+    def get_next_notification_attempt(self) -> Optional[int]:
+        """Get when the earliest queued or claimed outbox notice is next due, if any"""
+        try:
+            cursor = self.reader().cursor()
+            cursor.execute('''
+                SELECT MIN(next_attempt_at) FROM notification_outbox
+                WHERE status IN ('pending', 'sending')
+            ''')
+            return cursor.fetchone()[0]
+            
+        except sqlite3.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    @serialized_write
+    def prune_notifications(self, older_than_days: int = 90) -> int:
+        """Delete finished outbox entries older than the given age"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                DELETE FROM notification_outbox
+                WHERE status IN ('sent', 'failed', 'cancelled') AND created_at < ?
+            ''', (int(time.time()) - older_than_days * SECONDS_PER_DAY,))
+            deleted = cursor.rowcount
+            self.conn.commit()
+            return deleted
+            
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise Exception(f"Database error: {str(e)}")
+    
+    @reporting
     def get_recent_issues(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent book issues"""
         try:
-            cursor = self.conn.cursor()
+            cursor = self.reader().cursor()
             
             cursor.execute('''
                 SELECT 
-                    datetime(ib.issue_date) as issue_date,
+                    ib.issue_date,
                     b.title,
                     u.username
                 FROM issued_books ib
@@ -421,14 +1569,15 @@ class Database:
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
     
+    @reporting
     def get_recent_returns(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent book returns"""
         try:
-            cursor = self.conn.cursor()
+            cursor = self.reader().cursor()
             
             cursor.execute('''
                 SELECT 
-                    datetime(ib.return_date) as return_date,
+                    ib.return_date,
                     b.title,
                     u.username
                 FROM issued_books ib
@@ -444,15 +1593,191 @@ class Database:
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
     
+    def _fetch_page(self, query: str, params: List[Any], sort_column: str,
+                    id_column: str, descending: bool, after: Optional[Tuple[Any, int]],
+                    page_size: int) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]]:
+        """Run a keyset-paginated query and return one page plus the next cursor
+
+        The cursor is the (sort value, id) pair of the last row returned, so
+        rows inserted between calls never shift or repeat later pages.
+        """
+        if page_size <= 0:
+            raise ValueError("Page size must be positive")
+        
+        params = list(params)
+        if after is not None:
+            comparison = '<' if descending else '>'
+            query += f" AND ({sort_column}, {id_column}) {comparison} (?, ?)"
+            params.extend(after)
+        
+        direction = 'DESC' if descending else 'ASC'
+        query += f" ORDER BY {sort_column} {direction}, {id_column} {direction} LIMIT ?"
+        params.append(page_size + 1)  # One extra row tells us whether more remain
+        
+        cursor = self.reader().cursor()
+        cursor.execute(query, params)
+        rows = [dict(row) for row in cursor.fetchall()]
+        
+        if len(rows) <= page_size:
+            return rows, None
+        rows = rows[:page_size]
+        return rows, (rows[-1]['sort_key'], rows[-1]['id'])
+    
+    def get_books_page(self, sort_by: str = 'title', descending: bool = False,
+                       after: Optional[Tuple[Any, int]] = None, page_size: int = 50,
+                       category: Optional[str] = None, available: Optional[bool] = None,
+                       year: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]]:
+        """Get one page of books and the cursor for the next page
+        
+        Pass the returned cursor back as ``after`` to continue; it is None once
+        the listing is exhausted. ``sort_by`` is one of BOOK_SORT_COLUMNS.
+        """
+        if sort_by not in BOOK_SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort order: {sort_by}")
+        sort_column = BOOK_SORT_COLUMNS[sort_by]
+        
+        try:
+            query = f'''
+                SELECT id, title, author, category, isbn, publication_year, available,
+                       {sort_column} as sort_key
+                FROM books
+                WHERE 1=1
+            '''
+            params = []
+            
+            if category:
+                query += " AND category = ?"
+                params.append(category)
+            
+            if available is not None:
+                query += " AND available = ?"
+                params.append(available)
+            
+            if year:
+                query += " AND publication_year = ?"
+                params.append(year)
+            
+            return self._fetch_page(query, params, sort_column, 'id',
+                                    descending, after, page_size)
+            
+        except sqlite3.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    def get_users_page(self, sort_by: str = 'username', descending: bool = False,
+                       after: Optional[Tuple[Any, int]] = None, page_size: int = 50,
+                       role: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]]:
+        """Get one page of users and the cursor for the next page"""
+        if sort_by not in USER_SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort order: {sort_by}")
+        sort_column = USER_SORT_COLUMNS[sort_by]
+        
+        try:
+            query = f'''
+                SELECT id, username, email, role, roll_number,
+                       {sort_column} as sort_key
+                FROM users
+                WHERE 1=1
+            '''
+            params = []
+            
+            if role:
+                query += " AND role = ?"
+                params.append(role)
+            
+            return self._fetch_page(query, params, sort_column, 'id',
+                                    descending, after, page_size)
+            
+        except sqlite3.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    def get_loans_page(self, sort_by: str = 'issue_date', descending: bool = True,
+                       after: Optional[Tuple[Any, int]] = None, page_size: int = 50,
+                       user_id: Optional[int] = None,
+                       open_only: bool = True) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]]:
+        """Get one page of loans with book and borrower details
+        
+        Rows carry the loan id as both ``id`` and ``issue_id``. By default only
+        open loans are listed, newest first, straight from active_loans.
+        """
+        if sort_by not in LOAN_SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort order: {sort_by}")
+        
+        if open_only:
+            return self._get_open_loans_page(OPEN_LOAN_SORT_COLUMNS[sort_by], descending,
+                                             after, page_size, user_id)
+        sort_column = LOAN_SORT_COLUMNS[sort_by]
+        
+        try:
+            query = f'''
+                SELECT 
+                    ib.id,
+                    ib.id as issue_id,
+                    b.id as book_id,
+                    b.title,
+                    b.author,
+                    u.id as user_id,
+                    u.username as issued_to,
+                    ib.issue_date,
+                    ib.due_date,
+                    ib.return_date,
+                    {sort_column} as sort_key
+                FROM issued_books ib
+                JOIN books b ON ib.book_id = b.id
+                JOIN users u ON ib.user_id = u.id
+                WHERE 1=1
+            '''
+            params = []
+            
+            if user_id is not None:
+                query += " AND ib.user_id = ?"
+                params.append(user_id)
+            
+            return self._fetch_page(query, params, sort_column, 'ib.id',
+                                    descending, after, page_size)
+            
+        except sqlite3.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+    
+    def _get_open_loans_page(self, sort_column: str, descending: bool,
+                             after: Optional[Tuple[Any, int]], page_size: int,
+                             user_id: Optional[int]) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]]:
+        """get_loans_page() over active_loans, without touching loan history"""
+        try:
+            query = f'''
+                SELECT 
+                    al.issue_id as id,
+                    al.issue_id,
+                    b.id as book_id,
+                    b.title,
+                    b.author,
+                    u.id as user_id,
+                    u.username as issued_to,
+                    al.issue_date,
+                    al.due_date,
+                    NULL as return_date,
+                    {sort_column} as sort_key
+                FROM active_loans al
+                JOIN books b ON al.book_id = b.id
+                JOIN users u ON al.user_id = u.id
+                WHERE 1=1
+            '''
+            params = []
+            
+            if user_id is not None:
+                query += " AND al.user_id = ?"
+                params.append(user_id)
+            
+            return self._fetch_page(query, params, sort_column, 'al.issue_id',
+                                    descending, after, page_size)
+            
+        except sqlite3.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+    
     def get_all_books(self) -> List[Dict[str, Any]]:
         """Get all books from the database"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT id, title, author, category, isbn, publication_year, available
-                FROM books
-                ORDER BY title
-            ''')
+            cursor = self.reader().cursor()
+            cursor.execute(ALL_BOOKS_QUERY)
             books = cursor.fetchall()
             return [dict(book) for book in books]
         except Exception as e:
@@ -462,12 +1787,8 @@ class Database:
     def get_all_users(self) -> List[Dict[str, Any]]:
         """Get all users from the database"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT id, username, email, role, roll_number
-                FROM users
-                ORDER BY username
-            ''')
+            cursor = self.reader().cursor()
+            cursor.execute(ALL_USERS_QUERY)
             users = []
             for row in cursor.fetchall():
                 users.append({
@@ -482,8 +1803,9 @@ class Database:
             print(f"Error getting users: {str(e)}")
             raise
     
+    @serialized_write
     def delete_user(self, user_id: int) -> bool:
-        """Delete a user from the database"""
+        """Delete a user and their loans, including archived history, from the database"""
         try:
             cursor = self.conn.cursor()
             
@@ -501,6 +1823,11 @@ class Database:
             cursor.execute('BEGIN TRANSACTION')
             
             try:
+                # Debit archived loans only once, while the user still exists
+                cursor.execute('SELECT 1 FROM users WHERE id = ?', (user_id,))
+                if cursor.fetchone():
+                    self._debit_archived_loans(cursor, 'user_id', user_id)
+                
                 # Delete user's issued books history
                 cursor.execute('DELETE FROM issued_books WHERE user_id = ?', (user_id,))
                 
@@ -509,6 +1836,9 @@ class Database:
                 
                 # Commit transaction
                 self.conn.commit()
+                self.cache.invalidate(('user_details', user_id))
+                
+                self._purge_history(cursor, 'user_id', user_id)
                 return True
                 
             except sqlite3.Error as e:
@@ -519,25 +1849,27 @@ class Database:
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
     
+    @serialized_write
     def delete_book(self, book_id: int) -> bool:
-        """Delete a book from the database"""
+        """Delete a book and its loans, including archived history, from the database"""
         try:
             cursor = self.conn.cursor()
             
             # Check if book is currently issued
-            cursor.execute('''
-                SELECT COUNT(*) as count
-                FROM issued_books
-                WHERE book_id = ? AND return_date IS NULL
-            ''', (book_id,))
+            cursor.execute('SELECT 1 FROM active_loans WHERE book_id = ?', (book_id,))
             
-            if cursor.fetchone()['count'] > 0:
+            if cursor.fetchone():
                 raise Exception("Cannot delete book: It is currently issued to a user")
             
             # Begin transaction
             cursor.execute('BEGIN TRANSACTION')
             
             try:
+                # Debit archived loans only once, while the book still exists
+                cursor.execute('SELECT 1 FROM books WHERE id = ?', (book_id,))
+                if cursor.fetchone():
+                    self._debit_archived_loans(cursor, 'book_id', book_id)
+                
                 # Delete book's issue history
                 cursor.execute('DELETE FROM issued_books WHERE book_id = ?', (book_id,))
                 
@@ -546,6 +1878,10 @@ class Database:
                 
                 # Commit transaction
                 self.conn.commit()
+                # The deleted history also changes every borrower's totals
+                self.cache.clear()
+                
+                self._purge_history(cursor, 'book_id', book_id)
                 return True
                 
             except sqlite3.Error as e:
@@ -556,6 +1892,7 @@ class Database:
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
     
+    @serialized_write
     def delete_transaction(self, transaction_id: int) -> bool:
         """Delete a transaction (issued book record) from the database"""
         try:
@@ -563,7 +1900,7 @@ class Database:
             
             # Check if book is still issued
             cursor.execute('''
-                SELECT book_id, return_date
+                SELECT book_id, user_id, return_date
                 FROM issued_books
                 WHERE id = ?
             ''', (transaction_id,))
@@ -578,12 +1915,14 @@ class Database:
             # Delete transaction
             cursor.execute('DELETE FROM issued_books WHERE id = ?', (transaction_id,))
             self.conn.commit()
+            self.cache.invalidate(('user_details', transaction['user_id']))
             return True
             
         except sqlite3.Error as e:
             self.conn.rollback()
             raise Exception(f"Database error: {str(e)}")
     
+    @serialized_write
     def update_book(self, book_id: int, title: str, author: str, category: str,
                    isbn: str, publication_year: int, description: str = "") -> bool:
         """Update an existing book's details"""
@@ -622,6 +1961,7 @@ class Database:
                 
                 # Commit transaction
                 self.conn.commit()
+                self.cache.invalidate(*self._book_cache_keys(book_id))
                 return True
                 
             except sqlite3.Error as e:
@@ -634,8 +1974,13 @@ class Database:
     
     def get_book_by_id(self, book_id: int) -> Optional[Dict[str, Any]]:
         """Get a book's details by ID"""
+        key = ('book', book_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        generation = self.cache.generation()
         try:
-            cursor = self.conn.cursor()
+            cursor = self.reader().cursor()
             
             cursor.execute('''
                 SELECT * FROM books
@@ -643,7 +1988,10 @@ class Database:
             ''', (book_id,))
             
             result = cursor.fetchone()
-            return dict(result) if result else None
+            if not result:
+                return None
+            self.cache.put(key, dict(result), generation)
+            return dict(result)
             
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
@@ -651,22 +1999,9 @@ class Database:
     def get_user_issued_books(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all books currently issued to a user"""
         try:
-            cursor = self.conn.cursor()
+            cursor = self.reader().cursor()
             
-            cursor.execute('''
-                SELECT 
-                    b.*,
-                    ib.issue_date,
-                    ib.due_date,
-                    CASE 
-                        WHEN ib.due_date < datetime('now') THEN 1
-                        ELSE 0
-                    END as is_overdue
-                FROM issued_books ib
-                JOIN books b ON ib.book_id = b.id
-                WHERE ib.user_id = ? AND ib.return_date IS NULL
-                ORDER BY ib.issue_date DESC
-            ''', (user_id,))
+            cursor.execute(USER_ISSUED_BOOKS_QUERY, (user_id,))
             
             return [dict(row) for row in cursor.fetchall()]
             
@@ -676,27 +2011,101 @@ class Database:
     def get_user_overdue_books(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all overdue books for a user"""
         try:
-            cursor = self.conn.cursor()
+            cursor = self.reader().cursor()
             
-            cursor.execute('''
-                SELECT 
-                    b.*,
-                    ib.issue_date,
-                    ib.due_date,
-                    julianday('now') - julianday(ib.due_date) as days_overdue
-                FROM issued_books ib
-                JOIN books b ON ib.book_id = b.id
-                WHERE ib.user_id = ? 
-                AND ib.return_date IS NULL
-                AND ib.due_date < datetime('now')
-                ORDER BY ib.due_date
-            ''', (user_id,))
+            cursor.execute(USER_OVERDUE_BOOKS_QUERY, (user_id,))
             
             return [dict(row) for row in cursor.fetchall()]
             
         except sqlite3.Error as e:
             raise Exception(f"Database error: {str(e)}")
     
+    def _iter_rows(self, query: str, params: Iterable[Any] = (),
+                   chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[tuple]:
+        """Stream a query's rows as named tuples, fetching chunk_size at a time"""
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be positive")
+        
+        cursor = self.reader().cursor()
+        cursor.row_factory = None  # Plain tuples; the record type is built once
+        try:
+            cursor.execute(query, tuple(params))
+            make = record_type(tuple(column[0] for column in cursor.description))._make
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield make(row)
+        except sqlite3.Error as e:
+            raise Exception(f"Database error: {str(e)}")
+        finally:
+            cursor.close()
+    
+    def iter_available_books(self, chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[tuple]:
+        """Stream all available books (see get_available_books)"""
+        return self._iter_rows(AVAILABLE_BOOKS_QUERY, (), chunk_size)
+    
+    def iter_all_books(self, chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[tuple]:
+        """Stream all books (see get_all_books)"""
+        return self._iter_rows(ALL_BOOKS_QUERY, (), chunk_size)
+    
+    def iter_all_users(self, chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[tuple]:
+        """Stream all users (see get_all_users)"""
+        return self._iter_rows(ALL_USERS_QUERY, (), chunk_size)
+    
+    def iter_overdue_books(self, chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[tuple]:
+        """Stream all overdue books (see get_overdue_books)"""
+        return self._iter_rows(OVERDUE_BOOKS_QUERY, (), chunk_size)
+    
+    def iter_open_loan_due_dates(self, chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[tuple]:
+        """Stream (issue_id, due_date) for every open loan"""
+        return self._iter_rows('SELECT issue_id, due_date FROM active_loans', (), chunk_size)
+    
+    def iter_filtered_books(self, category: Optional[str] = None,
+                            available: Optional[bool] = None,
+                            year: Optional[int] = None,
+                            chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[tuple]:
+        """Stream books by category, availability, and year (see filter_books)"""
+        query, params = self._filter_books_query(category, available, year)
+        return self._iter_rows(query, params, chunk_size)
+    
+    def iter_user_books(self, user_id: int, include_history: bool = False,
+                        chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[tuple]:
+        """Stream all books issued to a user (see get_user_books)"""
+        query, params = self._user_books_query(self.reader().cursor(), user_id, include_history)
+        return self._iter_rows(query, params, chunk_size)
+    
+    def iter_user_issued_books(self, user_id: int,
+                               chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[tuple]:
+        """Stream the books currently issued to a user (see get_user_issued_books)"""
+        return self._iter_rows(USER_ISSUED_BOOKS_QUERY, (user_id,), chunk_size)
+    
+    def iter_user_overdue_books(self, user_id: int,
+                                chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[tuple]:
+        """Stream a user's overdue books (see get_user_overdue_books)"""
+        return self._iter_rows(USER_OVERDUE_BOOKS_QUERY, (user_id,), chunk_size)
+    
+    def iter_loans(self, open_only: bool = False, include_history: bool = False,
+                   chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[tuple]:
+        """Stream raw loan records for exports and sweeps
+        
+        Yields (id, book_id, user_id, issue_date, due_date, return_date)
+        records in id order. With ``include_history`` the archived
+        partitions come first, oldest year first.
+        """
+        columns = "id, book_id, user_id, issue_date, due_date, return_date"
+        if include_history and not open_only:
+            for table in reversed(self._history_tables(self.reader().cursor())):
+                yield from self._iter_rows(
+                    f"SELECT {columns} FROM history.{table} ORDER BY id", (), chunk_size)
+        
+        query = f"SELECT {columns} FROM issued_books"
+        if open_only:
+            query += " WHERE return_date IS NULL"
+        yield from self._iter_rows(query + " ORDER BY id", (), chunk_size)
+    
+    @serialized_write
     def create_default_admin(self):
         """Create a default admin user if no admin exists"""
         try:
@@ -194,7 +194,9 @@ def show_validation_errors(errors: Dict[str, str]):
     messagebox.showerror("Validation Error", message)
 
 def format_date(date_str: str) -> str:
-    """Format date string to YYYY-MM-DD"""
+    """Format date string or epoch seconds to YYYY-MM-DD"""
+    if isinstance(date_str, (int, float)):
+        return datetime.fromtimestamp(date_str).strftime("%Y-%m-%d")
     try:
         date = datetime.strptime(date_str, "%Y-%m-%d")
         return date.strftime("%Y-%m-%d")
@@ -202,7 +204,9 @@ def format_date(date_str: str) -> str:
         return date_str
 
 def format_datetime(dt_str: str) -> str:
-    """Format datetime string to YYYY-MM-DD HH:MM:SS"""
+    """Format datetime string or epoch seconds to YYYY-MM-DD HH:MM:SS"""
+    if isinstance(dt_str, (int, float)):
+        return datetime.fromtimestamp(dt_str).strftime("%Y-%m-%d %H:%M:%S")
     try:
         dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
         return dt.strftime("%Y-%m-%d %H:%M:%S")
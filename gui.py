@@ -4,8 +4,6 @@ from database import Database
 from datetime import datetime, timedelta
 from notifications import NotificationSystem
 from forms import UserForm, BookForm, IssueForm, show_validation_errors, format_date, format_datetime
-import threading
-import time
 import sys
 import traceback
 import os
@@ -166,6 +164,8 @@ class MainMenuForm:
             widget.destroy()
 
 class LibraryGUI:
+    PAGE_SIZE = 100  # Rows fetched per "Load More" click in list screens
+    
     def __init__(self, root):
         try:
             print("Initializing Library Management System...")
@@ -232,7 +232,7 @@ class LibraryGUI:
             self.status_var = tk.StringVar(value="All")
             
             print("Initializing database...")
-            self.db = Database()
+            self.db = Database(pooled=True)
             self.current_user = None
             self.current_role = None
             
@@ -245,9 +245,11 @@ class LibraryGUI:
             )
             self.notification_system.set_database(self.db)
             
+            # F12 prints query statistics when LIBRARY_DB_INSTRUMENT=1
+            self.root.bind('<F12>', lambda event: self.db.dump_stats())
+            
             print("Starting notification thread...")
-            self.notification_thread = threading.Thread(target=self.check_notifications, daemon=True)
-            self.notification_thread.start()
+            self.notification_system.start_notification_thread()
             
             print("Showing main menu...")
             self.show_main_menu()
@@ -377,11 +379,6 @@ class LibraryGUI:
             print(f"Error showing main menu: {str(e)}")
             traceback.print_exc()
     
-    def check_notifications(self):
-        while True:
-            self.notification_system.check_and_send_reminders()
-            time.sleep(3600)  # Check every hour
-    
     def show_login_frame(self):
         """Show the login form"""
         self.clear_window()
@@ -494,14 +491,16 @@ class LibraryGUI:
             print(f"Attempting login for user: {username} with role: {role}")
             
             # Get user data from database
-            cursor = self.db.conn.cursor()
-            hashed_password = self.db.hash_password(password)
-            cursor.execute('''
-                SELECT id, username, email, role, roll_number
-                FROM users
-                WHERE username = ? AND password = ? AND role = ?
-            ''', (username, hashed_password, role))
-            user = cursor.fetchone()
+            with self.db.track('gui.login') as call:
+                cursor = self.db.reader().cursor()
+                hashed_password = self.db.hash_password(password)
+                cursor.execute('''
+                    SELECT id, username, email, role, roll_number
+                    FROM users
+                    WHERE username = ? AND password = ? AND role = ?
+                ''', (username, hashed_password, role))
+                user = cursor.fetchone()
+                call.rows = int(user is not None)
             
             if user:
                 print(f"Login successful for user: {username}")
@@ -604,14 +603,14 @@ class LibraryGUI:
             stats_frame.pack(fill="x", pady=(0, 20))
             
             try:
-                total_books = len(self.db.get_all_books())
-                available_books = len(self.db.get_available_books())
-                total_users = len(self.db.get_all_users())
+                library_stats = self.db.get_stats()
                 
                 stats = [
-                    ("Total Books", total_books, "#4CAF50"),
-                    ("Available Books", available_books, "#2196F3"),
-                    ("Total Users", total_users, "#9C27B0")
+                    ("Total Books", library_stats['total_books'], "#4CAF50"),
+                    ("Available Books", library_stats['available_books'], "#2196F3"),
+                    ("Total Users", library_stats['total_users'], "#9C27B0"),
+                    ("Books Issued", library_stats['open_loans'], "#FF9800"),
+                    ("Overdue", library_stats['overdue_loans'], "#F44336")
                 ]
                 
                 for i, (label, value, color) in enumerate(stats):
@@ -627,9 +626,8 @@ class LibraryGUI:
                              text=label,
                              font=('Helvetica', 12)).pack()
                 
-                stats_frame.grid_columnconfigure(0, weight=1)
-                stats_frame.grid_columnconfigure(1, weight=1)
-                stats_frame.grid_columnconfigure(2, weight=1)
+                for i in range(len(stats)):
+                    stats_frame.grid_columnconfigure(i, weight=1)
                 
             except Exception as e:
                 print(f"Error loading stats: {str(e)}")
@@ -722,11 +720,11 @@ class LibraryGUI:
             
             try:
                 issued_books = self.db.get_user_issued_books(self.current_user['id'])
-                available_books = self.db.get_available_books()
+                library_stats = self.db.get_stats()
                 
                 stats = [
                     ("Books Issued", len(issued_books), "#4CAF50"),
-                    ("Available Books", len(available_books), "#2196F3")
+                    ("Available Books", library_stats['available_books'], "#2196F3")
                 ]
                 
                 for i, (label, value, color) in enumerate(stats):
@@ -776,8 +774,8 @@ class LibraryGUI:
                     tree.insert('', 'end', values=(
                         book['title'],
                         book['author'],
-                        book['issue_date'],
-                        book['due_date'],
+                        format_datetime(book['issue_date']),
+                        format_date(book['due_date']),
                         'Overdue' if book['is_overdue'] else 'Active'
                     ))
             except Exception as e:
@@ -880,8 +878,8 @@ class LibraryGUI:
                     tree.insert('', 'end', values=(
                         book['title'],
                         book['author'],
-                        book['issue_date'],
-                        book['due_date'],
+                        format_datetime(book['issue_date']),
+                        format_date(book['due_date']),
                         'Overdue' if book['is_overdue'] else 'Active'
                     ))
             except Exception as e:
@@ -1272,10 +1270,12 @@ class LibraryGUI:
                 
                 try:
                     # Get student ID from roll number
-                    cursor = self.db.conn.cursor()
-                    cursor.execute('SELECT id FROM users WHERE roll_number = ? AND role = "student"',
-                                 (roll_number,))
-                    student = cursor.fetchone()
+                    with self.db.track('gui.issue_book.find_student') as call:
+                        cursor = self.db.reader().cursor()
+                        cursor.execute('SELECT id FROM users WHERE roll_number = ? AND role = "student"',
+                                     (roll_number,))
+                        student = cursor.fetchone()
+                        call.rows = int(student is not None)
                     
                     if not student:
                         messagebox.showerror("Error", "Student not found")
@@ -1283,9 +1283,11 @@ class LibraryGUI:
                     
                     # Get book ID from title
                     book_title = book_title.split(" by ")[0]
-                    cursor.execute('SELECT id FROM books WHERE title = ? AND available = TRUE',
-                                 (book_title,))
-                    book = cursor.fetchone()
+                    with self.db.track('gui.issue_book.find_book') as call:
+                        cursor.execute('SELECT id FROM books WHERE title = ? AND available = TRUE',
+                                     (book_title,))
+                        book = cursor.fetchone()
+                        call.rows = int(book is not None)
                     
                     if not book:
                         messagebox.showerror("Error", "Book not available")
@@ -1403,26 +1405,27 @@ class LibraryGUI:
             search_entry.pack(side="left", padx=(0, 10))
             
             def search_books():
-                search_term = search_var.get().strip().lower()
+                search_term = search_var.get().strip()
+                if not search_term:
+                    reload_books()
+                    return
+                
                 for item in tree.get_children():
                     tree.delete(item)
+                load_more_button.configure(state='disabled')
                 
                 try:
-                    books = self.db.get_all_books()
+                    books = self.db.search_books(search_term)
                     for book in books:
-                        if (search_term in book['title'].lower() or
-                            search_term in book['author'].lower() or
-                            search_term in book['category'].lower() or
-                            search_term in str(book['isbn'])):
-                            tree.insert("", "end", values=(
-                                book['id'],
-                                book['title'],
-                                book['author'],
-                                book['category'],
-                                book['isbn'],
-                                book['publication_year'],
-                                "Yes" if book['available'] else "No"
-                            ))
+                        tree.insert("", "end", values=(
+                            book['id'],
+                            book['title'],
+                            book['author'],
+                            book['category'],
+                            book['isbn'],
+                            book['publication_year'],
+                            "Yes" if book['available'] else "No"
+                        ))
                 except Exception as e:
                     print(f"Error searching books: {str(e)}")
                     messagebox.showerror("Error", f"Failed to search books: {str(e)}")
@@ -1466,22 +1469,21 @@ class LibraryGUI:
             tree.pack(fill="both", expand=True)
             scrollbar.config(command=tree.yview)
             
-            # Load books
-            try:
-                books = self.db.get_all_books()
-                for book in books:
-                    tree.insert("", "end", values=(
-                        book['id'],
-                        book['title'],
-                        book['author'],
-                        book['category'],
-                        book['isbn'],
-                        book['publication_year'],
-                        "Yes" if book['available'] else "No"
-                    ))
-            except Exception as e:
-                print(f"Error loading books: {str(e)}")
-                messagebox.showerror("Error", f"Failed to load books: {str(e)}")
+            # Load books one page at a time
+            reload_books, load_more_button = self.paginate_tree(
+                content,
+                tree,
+                lambda after: self.db.get_books_page(after=after, page_size=self.PAGE_SIZE),
+                lambda book: (
+                    book['id'],
+                    book['title'],
+                    book['author'],
+                    book['category'],
+                    book['isbn'],
+                    book['publication_year'],
+                    "Yes" if book['available'] else "No"
+                )
+            )
             
             # Delete button
             def delete_book():
@@ -1555,7 +1557,7 @@ class LibraryGUI:
             
             # Create Treeview
             columns = ('Issue ID', 'Book ID', 'Title', 'Author', 'Issued To', 'Issue Date', 'Due Date')
-            tree = ttk.Treeview(list_frame, columns=columns, show='headings')
+            tree = ttk.Treeview(list_frame, columns=columns, show='headings', selectmode='extended')
             
             # Configure columns
             for col in columns:
@@ -1570,43 +1572,26 @@ class LibraryGUI:
             tree.pack(side="left", fill="both", expand=True)
             scrollbar.pack(side="right", fill="y")
             
-            # Load issued books
-            try:
-                cursor = self.db.conn.cursor()
-                cursor.execute('''
-                    SELECT 
-                        ib.id as issue_id,
-                        b.id as book_id,
-                        b.title,
-                        b.author,
-                        u.username as issued_to,
-                        ib.issue_date,
-                        ib.due_date
-                    FROM books b
-                    JOIN issued_books ib ON b.id = ib.book_id
-                    JOIN users u ON ib.user_id = u.id
-                    WHERE ib.return_date IS NULL
-                    ORDER BY ib.issue_date DESC
-                ''')
-                
-                for row in cursor.fetchall():
-                    tree.insert('', 'end', values=(
-                        row['issue_id'],
-                        row['book_id'],
-                        row['title'],
-                        row['author'],
-                        row['issued_to'],
-                        row['issue_date'],
-                        row['due_date']
-                    ))
-            except Exception as e:
-                print(f"Error loading issued books: {str(e)}")
-                messagebox.showerror("Error", f"Failed to load issued books: {str(e)}")
+            # Load open loans one page at a time, newest first
+            self.paginate_tree(
+                main_frame,
+                tree,
+                lambda after: self.db.get_loans_page(after=after, page_size=self.PAGE_SIZE),
+                lambda row: (
+                    row['issue_id'],
+                    row['book_id'],
+                    row['title'],
+                    row['author'],
+                    row['issued_to'],
+                    format_datetime(row['issue_date']),
+                    format_date(row['due_date'])
+                )
+            )
             
             # Return button
             ttk.Button(
                 main_frame,
-                text="Return Selected Book",
+                text="Return Selected Books",
                 command=lambda: self.return_selected_book(tree),
                 style='Accent.TButton'
             ).pack(pady=20)
@@ -1618,23 +1603,34 @@ class LibraryGUI:
             messagebox.showerror("Error", f"Failed to show return book form: {str(e)}")
 
     def return_selected_book(self, tree):
-        """Handle returning a selected book"""
+        """Handle returning the selected books in one batch"""
         try:
-            selected_item = tree.selection()
-            if not selected_item:
+            selected_items = tree.selection()
+            if not selected_items:
                 messagebox.showwarning("Warning", "Please select a book to return")
                 return
             
-            # Get issue ID from the selected item
-            issue_id = tree.item(selected_item[0])['values'][0]
+            # Map issue IDs back to their rows
+            items_by_issue = {tree.item(item)['values'][0]: item for item in selected_items}
             
-            # Return the book
-            if self.db.return_book(issue_id):
-                messagebox.showinfo("Success", "Book returned successfully")
-                # Remove the returned book from the tree
-                tree.delete(selected_item[0])
+            # Return all selected books in a single transaction
+            outcomes = self.db.return_books_batch(list(items_by_issue))
+            failed = []
+            for outcome in outcomes:
+                if outcome['success']:
+                    # Remove the returned book from the tree
+                    tree.delete(items_by_issue[outcome['issue_id']])
+                else:
+                    failed.append(f"Issue {outcome['issue_id']}: {outcome['error']}")
+            
+            returned = len(outcomes) - len(failed)
+            if not failed:
+                messagebox.showinfo("Success", f"{returned} book(s) returned successfully")
+            elif returned:
+                messagebox.showwarning("Partially Returned",
+                                       f"{returned} book(s) returned. Failed:\n" + "\n".join(failed))
             else:
-                messagebox.showerror("Error", "Failed to return book")
+                messagebox.showerror("Error", "Failed to return books:\n" + "\n".join(failed))
         except Exception as e:
             print(f"Error returning book: {str(e)}")
             traceback.print_exc()
@@ -1723,8 +1719,13 @@ class LibraryGUI:
             
             def search_users():
                 search_term = search_var.get().strip().lower()
+                if not search_term:
+                    reload_users()
+                    return
+                
                 for item in tree.get_children():
                     tree.delete(item)
+                load_more_button.configure(state='disabled')
                 
                 try:
                     users = self.db.get_all_users()
@@ -1770,20 +1771,19 @@ class LibraryGUI:
             tree.pack(side="left", fill="both", expand=True)
             scrollbar.pack(side="right", fill="y")
             
-            # Load users
-            try:
-                users = self.db.get_all_users()
-                for user in users:
-                    tree.insert('', 'end', values=(
-                        user['id'],
-                        user['username'],
-                        user['email'],
-                        user['role'],
-                        user['roll_number'] or 'N/A'
-                    ))
-            except Exception as e:
-                print(f"Error loading users: {str(e)}")
-                messagebox.showerror("Error", f"Failed to load users: {str(e)}")
+            # Load users one page at a time
+            reload_users, load_more_button = self.paginate_tree(
+                content,
+                tree,
+                lambda after: self.db.get_users_page(after=after, page_size=self.PAGE_SIZE),
+                lambda user: (
+                    user['id'],
+                    user['username'],
+                    user['email'],
+                    user['role'],
+                    user['roll_number'] or 'N/A'
+                )
+            )
             
             # Action buttons
             button_frame = ttk.Frame(content)
@@ -1833,6 +1833,38 @@ class LibraryGUI:
         for widget in self.root.winfo_children():
             widget.destroy()
 
+    def paginate_tree(self, parent, tree, fetch_page, row_values):
+        """Fill a treeview one page at a time behind a "Load More" button
+        
+        fetch_page(after) must return (rows, next_cursor) from one of the
+        Database get_*_page methods. Returns (reload, button) so search
+        handlers can restart the listing or disable paging for their results.
+        """
+        state = {'cursor': None}
+        button = ttk.Button(parent, text="Load More", style='Accent.TButton')
+        
+        def load_next_page():
+            try:
+                rows, state['cursor'] = fetch_page(state['cursor'])
+                for row in rows:
+                    tree.insert('', 'end', values=row_values(row))
+            except Exception as e:
+                state['cursor'] = None
+                print(f"Error loading page: {str(e)}")
+                messagebox.showerror("Error", f"Failed to load data: {str(e)}")
+            button.configure(state='normal' if state['cursor'] else 'disabled')
+        
+        def reload():
+            for item in tree.get_children():
+                tree.delete(item)
+            state['cursor'] = None
+            load_next_page()
+        
+        button.configure(command=load_next_page)
+        button.pack(pady=(10, 0))
+        reload()
+        return reload, button
+
     def add_book(self):
         """Add a new book to the database"""
         try:
@@ -1949,21 +1981,25 @@ class LibraryGUI:
             
             def search_books():
                 search_term = search_var.get().strip()
+                if not search_term:
+                    reload_books()
+                    return
+                
                 for item in tree.get_children():
                     tree.delete(item)
+                load_more_button.configure(state='disabled')
                 
                 try:
-                    books = self.db.search_books(search_term)
+                    books = self.db.search_books(search_term, available_only=True)
                     for book in books:
-                        if book['available']:
-                            tree.insert('', 'end', values=(
-                                book['id'],
-                                book['title'],
-                                book['author'],
-                                book['category'],
-                                book['isbn'],
-                                book['publication_year']
-                            ))
+                        tree.insert('', 'end', values=(
+                            book['id'],
+                            book['title'],
+                            book['author'],
+                            book['category'],
+                            book['isbn'],
+                            book['publication_year']
+                        ))
                 except Exception as e:
                     print(f"Error searching books: {str(e)}")
                     messagebox.showerror("Error", f"Failed to search books: {str(e)}")
@@ -1994,21 +2030,21 @@ class LibraryGUI:
             tree.pack(side="left", fill="both", expand=True)
             scrollbar.pack(side="right", fill="y")
             
-            # Load available books
-            try:
-                books = self.db.get_available_books()
-                for book in books:
-                    tree.insert('', 'end', values=(
-                        book['id'],
-                        book['title'],
-                        book['author'],
-                        book['category'],
-                        book['isbn'],
-                        book['publication_year']
-                    ))
-            except Exception as e:
-                print(f"Error loading books: {str(e)}")
-                messagebox.showerror("Error", f"Failed to load books: {str(e)}")
+            # Load available books one page at a time
+            reload_books, load_more_button = self.paginate_tree(
+                content,
+                tree,
+                lambda after: self.db.get_books_page(after=after, page_size=self.PAGE_SIZE,
+                                                     available=True),
+                lambda book: (
+                    book['id'],
+                    book['title'],
+                    book['author'],
+                    book['category'],
+                    book['isbn'],
+                    book['publication_year']
+                )
+            )
             
             print("Available books screen displayed successfully")
         except Exception as e:
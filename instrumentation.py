@@ -0,0 +1,290 @@
+import bisect
+import functools
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+def count_rows(result: Any) -> int:
+    """Number of rows a Database method returned"""
+    if result is None or isinstance(result, (bool, int, float, str)):
+        return 0
+    if isinstance(result, dict):
+        return 1
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])  # (rows, next_cursor) pages
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 0
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)  # Last bucket is +inf
+
+    def record(self, elapsed_ms: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bucket bound below which the given fraction of samples fall"""
+        total = sum(self.counts)
+        if not total:
+            return 0.0
+        threshold = fraction * total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else float('inf')
+        return float('inf')
+
+    def to_dict(self) -> Dict[str, int]:
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {label: count for label, count in zip(labels, self.counts) if count}
+
+class OperationStats:
+    """Counters for one instrumented operation"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = LatencyHistogram()
+
+    def record(self, elapsed_ms: float, rows: int, error: bool):
+        self.calls += 1
+        self.errors += int(error)
+        self.rows += rows
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.histogram.record(elapsed_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': self.histogram.percentile(0.5),
+            'p95_ms': self.histogram.percentile(0.95),
+            'p99_ms': self.histogram.percentile(0.99),
+            'histogram': self.histogram.to_dict()
+        }
+
+class CallTracker:
+    """Context manager timing one operation; set ``rows`` before leaving"""
+
+    def __init__(self, stats: 'QueryStats', name: str):
+        self.stats = stats
+        self.name = name
+        self.rows = 0
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        self.stats.record(self.name, elapsed_ms, self.rows, exc_type is not None)
+        return False
+
+class NullTracker:
+    """Stand-in for CallTracker when instrumentation is disabled"""
+
+    rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+class QueryStats:
+    """Thread-safe registry of per-operation latency statistics
+
+    Operations are Database methods (recorded by name), GUI queries
+    (recorded via track()) and individual SQL statements, which are also
+    checked against the slow query threshold.
+    """
+
+    def __init__(self, slow_query_ms: float = 100):
+        self.slow_query_ms = slow_query_ms
+        self.operations: Dict[str, OperationStats] = {}
+        self.statements = OperationStats()
+        self.slow_queries: List[Dict[str, Any]] = []
+        self.max_slow_queries = 100  # Most recent slow queries kept for dumps
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def record(self, name: str, elapsed_ms: float, rows: int = 0, error: bool = False):
+        """Record one completed operation"""
+        with self._lock:
+            stats = self.operations.get(name)
+            if stats is None:
+                stats = self.operations[name] = OperationStats()
+            stats.record(elapsed_ms, rows, error)
+
+    def track(self, name: str) -> CallTracker:
+        """Time a block of code as the named operation"""
+        return CallTracker(self, name)
+
+    def wrap(self, name: str, method: Callable) -> Callable:
+        """Wrap a callable so each call is recorded as the named operation"""
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.track(name) as call:
+                result = method(*args, **kwargs)
+                call.rows = count_rows(result)
+                return result
+        return wrapper
+
+    def trace(self, statement: str):
+        """sqlite3 trace callback collecting statements run on this thread"""
+        statements = getattr(self._local, 'statements', None)
+        if statements is not None:
+            statements.append(statement)
+
+    def record_statement(self, conn: sqlite3.Connection, sql: str, params: Any,
+                         elapsed_ms: float, rows: int, error: bool, traced: List[str]):
+        """Record one SQL statement and log it if it was slow"""
+        with self._lock:
+            self.statements.record(elapsed_ms, rows, error)
+
+        if elapsed_ms < self.slow_query_ms:
+            return
+
+        plan = self.explain(conn, sql, params)
+        entry = {
+            'sql': ' '.join(sql.split()),
+            'elapsed_ms': round(elapsed_ms, 3),
+            'executed': traced,  # Expanded SQL including trigger sub-statements
+            'plan': plan
+        }
+        with self._lock:
+            self.slow_queries.append(entry)
+            del self.slow_queries[:-self.max_slow_queries]
+        logger.warning("Slow query (%.1f ms): %s\n  plan: %s",
+                       elapsed_ms, entry['sql'], "; ".join(plan) or "n/a")
+
+    def begin_statement(self) -> List[str]:
+        """Start collecting traced statements for the current thread"""
+        self._local.statements = []
+        return self._local.statements
+
+    def end_statement(self):
+        self._local.statements = None
+
+    @staticmethod
+    def explain(conn: sqlite3.Connection, sql: str, params: Any) -> List[str]:
+        """EXPLAIN QUERY PLAN details for a statement, or [] if unavailable"""
+        try:
+            rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params or ())
+            return [row[3] for row in rows.fetchall()]
+        except sqlite3.Error:
+            return []
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current statistics as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                'operations': {name: stats.to_dict()
+                               for name, stats in sorted(self.operations.items())},
+                'statements': self.statements.to_dict(),
+                'slow_queries': list(self.slow_queries)
+            }
+
+    def dump(self, path: Optional[str] = None) -> str:
+        """Return the statistics as JSON, also writing them to path if given"""
+        data = json.dumps(self.snapshot(), indent=2)
+        if path:
+            with open(path, 'w') as f:
+                f.write(data)
+        return data
+
+    def format_report(self) -> str:
+        """Human readable table of operations ordered by total time"""
+        snapshot = self.snapshot()
+        lines = [f"{'operation':<32} {'calls':>7} {'errors':>6} {'rows':>8} "
+                 f"{'avg ms':>9} {'p95 ms':>8} {'max ms':>9}"]
+        operations = sorted(snapshot['operations'].items(),
+                            key=lambda item: item[1]['total_ms'], reverse=True)
+        for name, stats in operations:
+            lines.append(f"{name:<32} {stats['calls']:>7} {stats['errors']:>6} {stats['rows']:>8} "
+                         f"{stats['avg_ms']:>9.3f} {stats['p95_ms']:>8} {stats['max_ms']:>9.3f}")
+        statements = snapshot['statements']
+        lines.append(f"SQL statements: {statements['calls']}, "
+                     f"slow (>= {self.slow_query_ms} ms): {len(snapshot['slow_queries'])}")
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self.operations.clear()
+            self.statements = OperationStats()
+            self.slow_queries.clear()
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times every statement it executes"""
+
+    def _timed(self, run: Callable, sql: str, params: Any):
+        stats = self.connection.stats
+        if stats is None:
+            return run()
+
+        traced = stats.begin_statement()
+        start = time.perf_counter()
+        error = False
+        try:
+            return run()
+        except Exception:
+            error = True
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stats.end_statement()
+            stats.record_statement(self.connection, sql, params, elapsed_ms,
+                                   max(self.rowcount, 0), error, traced)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(lambda: super(InstrumentedCursor, self).execute(sql, parameters),
+                           sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        first = seq_of_parameters[0] if seq_of_parameters else ()
+        return self._timed(lambda: super(InstrumentedCursor, self).executemany(sql, seq_of_parameters),
+                           sql, first)
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors time statements and report slow queries
+
+    Pass as ``factory`` to sqlite3.connect() and then call attach().
+    """
+
+    stats: Optional[QueryStats] = None
+
+    def attach(self, stats: QueryStats):
+        """Start recording statements executed on this connection"""
+        self.stats = stats
+        self.set_trace_callback(stats.trace)
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -1,10 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import os
+import sqlite3
 import sys
 from datetime import datetime
-import threading
-import time
 
 # Import custom modules
 from database import Database
@@ -96,7 +95,7 @@ class LibraryApp:
         
         # Initialize database
         try:
-            self.db = Database()
+            self.db = Database(pooled=True)
             print("Database initialized successfully")
         except Exception as e:
             show_error("Database Error", str(e))
@@ -112,12 +111,8 @@ class LibraryApp:
         )
         self.notification_system.set_database(self.db)
         
-        # Start notification thread
-        self.notification_thread = threading.Thread(
-            target=self.check_notifications,
-            daemon=True
-        )
-        self.notification_thread.start()
+        # Start the reminder scheduler
+        self.notification_system.start_notification_thread()
         
         # Initialize UI
         self.setup_ui()
@@ -277,15 +272,6 @@ class LibraryApp:
         self.time_label.configure(text=f"Current Time: {current_time}")
         self.root.after(1000, self.update_time)
     
-    def check_notifications(self):
-        """Check for notifications in the background"""
-        while True:
-            try:
-                self.notification_system.check_and_send_reminders()
-            except Exception as e:
-                print(f"Notification error: {str(e)}")
-            time.sleep(3600)  # Check every hour
-    
     def login(self):
         """Handle user login"""
         username = self.username_var.get()
@@ -407,20 +393,11 @@ class LibraryApp:
             for item in self.books_tree.get_children():
                 self.books_tree.delete(item)
             
-            # Get all books
-            books = self.db.get_available_books()
-            
-            # Filter books based on search term
-            filtered_books = [
-                book for book in books
-                if search_term in book['title'].lower() or
-                   search_term in book['author'].lower() or
-                   search_term in book['category'].lower() or
-                   search_term in book['isbn'].lower()
-            ]
+            # Search the catalog index for available books
+            books = self.db.search_books(search_term, available_only=True)
             
-            # Insert filtered books into treeview
-            for book in filtered_books:
+            # Insert matching books into treeview
+            for book in books:
                 self.books_tree.insert('', 'end', values=(
                     book['title'],
                     book['author'],
@@ -433,14 +410,18 @@ class LibraryApp:
 
 def main():
     try:
-        # Check for locked database
+        # Check for a write lock held by another process; opening the file
+        # itself would say nothing about SQLite's locks
         if os.path.exists('library.db'):
+            probe = sqlite3.connect('library.db', timeout=2)
             try:
-                with open('library.db', 'a'):
-                    pass
-            except IOError:
-                print("Database file is locked. Please close any other instances of the application.")
+                probe.execute('BEGIN IMMEDIATE')
+                probe.rollback()
+            except sqlite3.OperationalError:
+                print("Database is locked. Please close any other instances of the application.")
                 sys.exit(1)
+            finally:
+                probe.close()
         
         # Create and run application
         root = tk.Tk()
@@ -0,0 +1,637 @@
+import sqlite3
+from typing import Callable, List, Tuple
+
+# Registered migrations as (version, description, apply) in ascending order
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = []
+
+def migration(version: int, description: str):
+    """Register a schema migration for the given user_version"""
+    def register(apply: Callable[[sqlite3.Connection], None]):
+        if MIGRATIONS and MIGRATIONS[-1][0] >= version:
+            raise ValueError(f"Migration {version} registered out of order")
+        MIGRATIONS.append((version, description, apply))
+        return apply
+    return register
+
+def latest_version() -> int:
+    """Get the schema version the registered migrations lead to"""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Get the schema version stored in the database"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """Apply every pending migration and return the resulting version
+
+    Each migration runs in its own transaction together with the
+    ``user_version`` bump, so a failed migration leaves the schema at the
+    last version that was applied completely. An up-to-date database costs a
+    single PRAGMA read.
+    """
+    current = get_schema_version(conn)
+    if current >= latest_version():
+        return current
+
+    for version, description, apply in MIGRATIONS:
+        if version <= current:
+            continue
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Re-check under the write lock in case another process migrated
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                current = version
+                continue
+
+            apply(conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        print(f"Applied migration {version}: {description}")
+        current = version
+
+    return current
+
+@migration(1, "create users, books and issued_books tables")
+def create_base_tables(conn: sqlite3.Connection):
+    # IF NOT EXISTS so databases created before versioning adopt version 1
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL,
+            roll_number TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            category TEXT NOT NULL,
+            isbn TEXT UNIQUE NOT NULL,
+            publication_year INTEGER NOT NULL,
+            description TEXT,
+            available BOOLEAN DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS issued_books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            issue_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            due_date TIMESTAMP NOT NULL,
+            return_date TIMESTAMP,
+            FOREIGN KEY (book_id) REFERENCES books (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+@migration(2, "add secondary indexes for loan, catalog and user lookups")
+def create_lookup_indexes(conn: sqlite3.Connection):
+    # Loan history by user/book (get_user_books, delete_user, delete_book)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_issued_books_user ON issued_books (user_id, issue_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_issued_books_book ON issued_books (book_id)')
+
+    # Open loans only; these stay small no matter how long the history gets
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_issued_books_open_due
+        ON issued_books (due_date) WHERE return_date IS NULL
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_issued_books_open_book
+        ON issued_books (book_id, user_id) WHERE return_date IS NULL
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_issued_books_open_user
+        ON issued_books (user_id, due_date) WHERE return_date IS NULL
+    ''')
+
+    # Recent activity feeds
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_issued_books_issue_date ON issued_books (issue_date)')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_issued_books_return_date
+        ON issued_books (return_date) WHERE return_date IS NOT NULL
+    ''')
+
+    # Catalog listings ordered by title, optionally filtered by availability
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_title ON books (title)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_available_title ON books (available, title)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_category ON books (category, title)')
+
+    # Login and issue-desk lookups
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_role ON users (role)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_roll_number ON users (roll_number)')
+
+    # Refresh planner statistics; the limit bounds the cost on large tables
+    conn.execute('PRAGMA analysis_limit = 1000')
+    conn.execute('ANALYZE')
+
+def fts5_available() -> bool:
+    """Check whether the linked SQLite library was built with FTS5"""
+    probe = sqlite3.connect(':memory:')
+    try:
+        probe.execute('CREATE VIRTUAL TABLE fts5_probe USING fts5(x)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+
+# Kept separate so bulk loads can drop them and index new rows in one pass
+BOOKS_FTS_INSERT_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books
+    BEGIN
+        INSERT INTO books_fts (rowid, title, author, category, description)
+        VALUES (NEW.id, NEW.title, NEW.author, NEW.category, NEW.description);
+    END
+'''
+
+BOOKS_FTS_UPDATE_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS books_fts_update
+    AFTER UPDATE OF title, author, category, description ON books
+    BEGIN
+        INSERT INTO books_fts (books_fts, rowid, title, author, category, description)
+        VALUES ('delete', OLD.id, OLD.title, OLD.author, OLD.category, OLD.description);
+        INSERT INTO books_fts (rowid, title, author, category, description)
+        VALUES (NEW.id, NEW.title, NEW.author, NEW.category, NEW.description);
+    END
+'''
+
+@migration(3, "add FTS5 catalog search index over books")
+def create_books_fts(conn: sqlite3.Connection):
+    if not fts5_available():
+        # search_books falls back to LIKE matching without the index
+        print("FTS5 is not available in this SQLite build; skipping search index")
+        return
+
+    # External-content table: the index stores tokens only, rows stay in books
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            title, author, category, description,
+            content='books',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+
+    # Weight title and author matches above category and description
+    conn.execute('''
+        INSERT INTO books_fts (books_fts, rank)
+        VALUES ('rank', 'bm25(10.0, 5.0, 1.0, 1.0)')
+    ''')
+
+    conn.execute(BOOKS_FTS_INSERT_TRIGGER)
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books
+        BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author, category, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.author, OLD.category, OLD.description);
+        END
+    ''')
+    conn.execute(BOOKS_FTS_UPDATE_TRIGGER)
+
+    # Index the existing catalog
+    conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+@migration(4, "add indexes backing the keyset-paginated listings")
+def create_pagination_indexes(conn: sqlite3.Connection):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_author ON books (author)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_year ON books (publication_year)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_role_username ON users (role, username)')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_issued_books_open_issue_date
+        ON issued_books (issue_date) WHERE return_date IS NULL
+    ''')
+
+# Cut-off of the last overdue sweep, comparable with TEXT issued_books.due_date
+OVERDUE_AS_OF = "(SELECT datetime(value, 'unixepoch') FROM library_stats WHERE name = 'overdue_as_of')"
+
+# The same cut-off once loan dates are epoch seconds (migration 8)
+OVERDUE_AS_OF_EPOCH = "(SELECT value FROM library_stats WHERE name = 'overdue_as_of')"
+
+def _counted_overdue(row: str, as_of: str = OVERDUE_AS_OF) -> str:
+    """0/1 SQL expression: the loan row is open and was due before the sweep"""
+    return f"({row}.return_date IS NULL AND {row}.due_date < {as_of})"
+
+@migration(5, "add trigger-maintained library_stats counters")
+def create_library_stats(conn: sqlite3.Connection):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS library_stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+    # Seed from the current data; users are counted per role as users:<role>
+    conn.execute('DELETE FROM library_stats')
+    conn.execute('''
+        INSERT INTO library_stats (name, value)
+        SELECT 'total_books', COUNT(*) FROM books
+        UNION ALL SELECT 'available_books', COUNT(*) FROM books WHERE available IS TRUE
+        UNION ALL SELECT 'total_users', COUNT(*) FROM users
+        UNION ALL SELECT 'open_loans', COUNT(*) FROM issued_books WHERE return_date IS NULL
+        UNION ALL SELECT 'overdue_loans', COUNT(*) FROM issued_books
+                  WHERE return_date IS NULL AND due_date < datetime('now')
+        UNION ALL SELECT 'overdue_as_of', CAST(strftime('%s', 'now') AS INTEGER)
+    ''')
+    conn.execute('''
+        INSERT INTO library_stats (name, value)
+        SELECT 'users:' || role, COUNT(*) FROM users GROUP BY role
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS library_stats_book_insert AFTER INSERT ON books
+        BEGIN
+            UPDATE library_stats SET value = value + 1 WHERE name = 'total_books';
+            UPDATE library_stats SET value = value + (NEW.available IS TRUE)
+            WHERE name = 'available_books';
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS library_stats_book_delete AFTER DELETE ON books
+        BEGIN
+            UPDATE library_stats SET value = value - 1 WHERE name = 'total_books';
+            UPDATE library_stats SET value = value - (OLD.available IS TRUE)
+            WHERE name = 'available_books';
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS library_stats_book_available
+        AFTER UPDATE OF available ON books
+        WHEN (NEW.available IS TRUE) != (OLD.available IS TRUE)
+        BEGIN
+            UPDATE library_stats SET value = value + (NEW.available IS TRUE) - (OLD.available IS TRUE)
+            WHERE name = 'available_books';
+        END
+    ''')
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS library_stats_user_insert AFTER INSERT ON users
+        BEGIN
+            UPDATE library_stats SET value = value + 1 WHERE name = 'total_users';
+            INSERT INTO library_stats (name, value) VALUES ('users:' || NEW.role, 1)
+            ON CONFLICT (name) DO UPDATE SET value = value + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS library_stats_user_delete AFTER DELETE ON users
+        BEGIN
+            UPDATE library_stats SET value = value - 1 WHERE name = 'total_users';
+            UPDATE library_stats SET value = value - 1 WHERE name = 'users:' || OLD.role;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS library_stats_user_role
+        AFTER UPDATE OF role ON users
+        WHEN NEW.role IS NOT OLD.role
+        BEGIN
+            UPDATE library_stats SET value = value - 1 WHERE name = 'users:' || OLD.role;
+            INSERT INTO library_stats (name, value) VALUES ('users:' || NEW.role, 1)
+            ON CONFLICT (name) DO UPDATE SET value = value + 1;
+        END
+    ''')
+
+    _create_library_stats_loan_triggers(conn, OVERDUE_AS_OF)
+
+def _create_library_stats_loan_triggers(conn: sqlite3.Connection, as_of: str):
+    """Keep the open and overdue loan counters in step with issued_books"""
+    # overdue_loans only counts loans that were due before overdue_as_of;
+    # readers add the loans that fell due since then from the due_date index
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS library_stats_loan_insert AFTER INSERT ON issued_books
+        BEGIN
+            UPDATE library_stats SET value = value + (NEW.return_date IS NULL)
+            WHERE name = 'open_loans';
+            UPDATE library_stats SET value = value + {_counted_overdue('NEW', as_of)}
+            WHERE name = 'overdue_loans';
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS library_stats_loan_delete AFTER DELETE ON issued_books
+        BEGIN
+            UPDATE library_stats SET value = value - (OLD.return_date IS NULL)
+            WHERE name = 'open_loans';
+            UPDATE library_stats SET value = value - {_counted_overdue('OLD', as_of)}
+            WHERE name = 'overdue_loans';
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS library_stats_loan_update
+        AFTER UPDATE OF return_date, due_date ON issued_books
+        BEGIN
+            UPDATE library_stats SET value = value + (NEW.return_date IS NULL) - (OLD.return_date IS NULL)
+            WHERE name = 'open_loans';
+            UPDATE library_stats SET value = value + {_counted_overdue('NEW', as_of)} - {_counted_overdue('OLD', as_of)}
+            WHERE name = 'overdue_loans';
+        END
+    ''')
+
+@migration(6, "add trigger-maintained active_loans table")
+def create_active_loans(conn: sqlite3.Connection):
+    # One row per book currently on loan; the primary key also rules out
+    # two open loans for the same copy
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS active_loans (
+            book_id INTEGER PRIMARY KEY,
+            issue_id INTEGER UNIQUE NOT NULL,
+            user_id INTEGER NOT NULL,
+            issue_date TIMESTAMP NOT NULL,
+            due_date TIMESTAMP NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_active_loans_issue_date ON active_loans (issue_date, issue_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_active_loans_due_date ON active_loans (due_date, issue_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_active_loans_user ON active_loans (user_id, due_date)')
+
+    # Backfill; should legacy data hold several open loans for a book, the
+    # latest one is taken as the current holder
+    conn.execute('''
+        INSERT OR REPLACE INTO active_loans (book_id, issue_id, user_id, issue_date, due_date)
+        SELECT book_id, id, user_id, issue_date, due_date
+        FROM issued_books
+        WHERE return_date IS NULL
+        ORDER BY id
+    ''')
+
+    conn.execute('''
+        UPDATE books
+        SET available = NOT EXISTS (SELECT 1 FROM active_loans WHERE book_id = books.id)
+        WHERE (available IS TRUE) = EXISTS (SELECT 1 FROM active_loans WHERE book_id = books.id)
+    ''')
+
+    _create_active_loans_triggers(conn)
+
+    # books.available mirrors whether the book has an active loan
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS active_loans_claim AFTER INSERT ON active_loans
+        BEGIN
+            UPDATE books SET available = FALSE WHERE id = NEW.book_id AND available IS NOT FALSE;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS active_loans_release AFTER DELETE ON active_loans
+        BEGIN
+            UPDATE books SET available = TRUE WHERE id = OLD.book_id AND available IS NOT TRUE;
+        END
+    ''')
+
+def _create_active_loans_triggers(conn: sqlite3.Connection):
+    """Keep active_loans in step with open rows in issued_books"""
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS active_loans_issue AFTER INSERT ON issued_books
+        WHEN NEW.return_date IS NULL
+        BEGIN
+            INSERT INTO active_loans (book_id, issue_id, user_id, issue_date, due_date)
+            VALUES (NEW.book_id, NEW.id, NEW.user_id, NEW.issue_date, NEW.due_date);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS active_loans_return
+        AFTER UPDATE OF return_date ON issued_books
+        WHEN NEW.return_date IS NOT NULL AND OLD.return_date IS NULL
+        BEGIN
+            DELETE FROM active_loans WHERE issue_id = OLD.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS active_loans_due_date
+        AFTER UPDATE OF due_date ON issued_books
+        WHEN NEW.return_date IS NULL
+        BEGIN
+            UPDATE active_loans SET due_date = NEW.due_date WHERE issue_id = NEW.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS active_loans_delete AFTER DELETE ON issued_books
+        WHEN OLD.return_date IS NULL
+        BEGIN
+            DELETE FROM active_loans WHERE issue_id = OLD.id;
+        END
+    ''')
+
+@migration(7, "add trigger-maintained per-user loan counters")
+def create_user_loan_stats(conn: sqlite3.Connection):
+    # overdue_books follows the library_stats convention: loans due before
+    # overdue_as_of, with later ones added by readers or the overdue sweep
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_loan_stats (
+            user_id INTEGER PRIMARY KEY,
+            total_issued INTEGER NOT NULL DEFAULT 0,
+            current_books INTEGER NOT NULL DEFAULT 0,
+            overdue_books INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    conn.execute('DELETE FROM user_loan_stats')
+    conn.execute(f'''
+        INSERT INTO user_loan_stats (user_id, total_issued, current_books, overdue_books)
+        SELECT 
+            user_id,
+            COUNT(*),
+            SUM(return_date IS NULL),
+            SUM({_counted_overdue('issued_books')})
+        FROM issued_books
+        GROUP BY user_id
+    ''')
+
+    _create_user_loan_stats_triggers(conn, OVERDUE_AS_OF)
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS user_loan_stats_user_delete AFTER DELETE ON users
+        BEGIN
+            DELETE FROM user_loan_stats WHERE user_id = OLD.id;
+        END
+    ''')
+
+def _create_user_loan_stats_triggers(conn: sqlite3.Connection, as_of: str):
+    """Keep user_loan_stats in step with issued_books"""
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS user_loan_stats_issue AFTER INSERT ON issued_books
+        BEGIN
+            INSERT INTO user_loan_stats (user_id, total_issued, current_books, overdue_books)
+            VALUES (NEW.user_id, 1, NEW.return_date IS NULL, {_counted_overdue('NEW', as_of)})
+            ON CONFLICT (user_id) DO UPDATE SET
+                total_issued = total_issued + 1,
+                current_books = current_books + excluded.current_books,
+                overdue_books = overdue_books + excluded.overdue_books;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS user_loan_stats_update
+        AFTER UPDATE OF return_date, due_date ON issued_books
+        BEGIN
+            UPDATE user_loan_stats SET
+                current_books = current_books + (NEW.return_date IS NULL) - (OLD.return_date IS NULL),
+                overdue_books = overdue_books + {_counted_overdue('NEW', as_of)} - {_counted_overdue('OLD', as_of)}
+            WHERE user_id = NEW.user_id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS user_loan_stats_delete AFTER DELETE ON issued_books
+        BEGIN
+            UPDATE user_loan_stats SET
+                total_issued = total_issued - 1,
+                current_books = current_books - (OLD.return_date IS NULL),
+                overdue_books = overdue_books - {_counted_overdue('OLD', as_of)}
+            WHERE user_id = OLD.user_id;
+        END
+    ''')
+
+def _to_epoch(column: str) -> str:
+    """SQL converting a TEXT timestamp column to epoch seconds, keeping NULLs"""
+    return f"CAST(strftime('%s', {column}) AS INTEGER)"
+
+@migration(8, "store loan dates as integer epoch seconds")
+def convert_loan_dates_to_epoch(conn: sqlite3.Connection):
+    # Rebuild issued_books with INTEGER dates; dropping the old table also
+    # drops its indexes and triggers, which are recreated below
+    conn.execute('''
+        CREATE TABLE issued_books_epoch (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            issue_date INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            due_date INTEGER NOT NULL,
+            return_date INTEGER,
+            FOREIGN KEY (book_id) REFERENCES books (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    conn.execute(f'''
+        INSERT INTO issued_books_epoch (id, book_id, user_id, issue_date, due_date, return_date)
+        SELECT 
+            id, book_id, user_id,
+            COALESCE({_to_epoch('issue_date')}, {_to_epoch('due_date')}),
+            {_to_epoch('due_date')},
+            {_to_epoch('return_date')}
+        FROM issued_books
+    ''')
+
+    # Keep the AUTOINCREMENT high-water mark so deleted or archived loan ids
+    # are never handed out again
+    last_id = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'issued_books'").fetchone()
+    conn.execute('DROP TABLE issued_books')
+    conn.execute('ALTER TABLE issued_books_epoch RENAME TO issued_books')
+    if last_id:
+        conn.execute('''
+            UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'issued_books'
+        ''', (last_id[0],))
+
+    create_lookup_indexes(conn)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_issued_books_open_issue_date
+        ON issued_books (issue_date) WHERE return_date IS NULL
+    ''')
+    _create_library_stats_loan_triggers(conn, OVERDUE_AS_OF_EPOCH)
+    _create_active_loans_triggers(conn)
+    _create_user_loan_stats_triggers(conn, OVERDUE_AS_OF_EPOCH)
+
+    # TIMESTAMP columns have NUMERIC affinity, so the denormalized copies and
+    # archived partitions store epoch integers without a rebuild
+    conn.execute(f'''
+        UPDATE active_loans
+        SET issue_date = {_to_epoch('issue_date')}, due_date = {_to_epoch('due_date')}
+        WHERE typeof(due_date) = 'text'
+    ''')
+    attached = {row[1] for row in conn.execute('PRAGMA database_list')}
+    if 'history' in attached:
+        tables = conn.execute('''
+            SELECT name FROM history.sqlite_master
+            WHERE type = 'table' AND name GLOB 'loans_[0-9][0-9][0-9][0-9]'
+        ''').fetchall()
+        for (table,) in tables:
+            conn.execute(f'''
+                UPDATE history.{table}
+                SET issue_date = {_to_epoch('issue_date')},
+                    due_date = {_to_epoch('due_date')},
+                    return_date = {_to_epoch('return_date')}
+                WHERE typeof(due_date) = 'text'
+            ''')
+
+# Tables whose row changes are appended to the changes feed
+CHANGE_TRACKED_TABLES = ('books', 'users', 'issued_books')
+
+@migration(9, "add trigger-written changes feed for books, users and loans")
+def create_changes_feed(conn: sqlite3.Connection):
+    # AUTOINCREMENT keeps seq increasing even after old changes are pruned
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            operation TEXT NOT NULL CHECK (operation IN ('insert', 'update', 'delete')),
+            changed_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_changes_changed_at ON changes (changed_at)')
+
+    # Consumers that fall behind the pruned sequence must reload in full
+    conn.execute('''
+        INSERT OR IGNORE INTO library_stats (name, value) VALUES ('changes_pruned_through', 0)
+    ''')
+
+    for table in CHANGE_TRACKED_TABLES:
+        _create_change_triggers(conn, table)
+
+def _create_change_triggers(conn: sqlite3.Connection, table: str):
+    """Append every insert, update and delete on a table to the changes feed"""
+    for operation, row in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_changes_{operation}
+            AFTER {operation.upper()} ON {table}
+            BEGIN
+                INSERT INTO changes (table_name, row_id, operation)
+                VALUES ('{table}', {row}.id, '{operation}');
+            END
+        ''')
+
+@migration(10, "add notification_outbox for deduplicated reminder delivery")
+def create_notification_outbox(conn: sqlite3.Connection):
+    # One row per notice owed: a due reminder once per loan (period 0) and
+    # an overdue notice once per overdue period. The UNIQUE key makes
+    # re-enqueueing the same notice a no-op. While a row is 'sending',
+    # next_attempt_at is when the sender's claim lapses.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY,
+            issue_id INTEGER NOT NULL,
+            notice TEXT NOT NULL CHECK (notice IN ('due', 'overdue')),
+            period INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            email TEXT NOT NULL,
+            title TEXT NOT NULL,
+            due_date INTEGER NOT NULL,
+            days_overdue INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending'
+                CHECK (status IN ('pending', 'sending', 'sent', 'failed', 'cancelled')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at INTEGER NOT NULL,
+            last_error TEXT,
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            sent_at INTEGER,
+            UNIQUE (issue_id, notice, period)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notification_outbox_queue
+        ON notification_outbox (status, next_attempt_at)
+        WHERE status IN ('pending', 'sending')
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notification_outbox_created
+        ON notification_outbox (created_at)
+    ''')
@@ -1,11 +1,13 @@
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
-import threading
 import time
 import logging
-from typing import Optional, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple
+
+from scheduler import ReminderScheduler
+from smtp_pool import SMTPSessionPool
 
 # Configure logging
 logging.basicConfig(
@@ -63,18 +65,79 @@ class EmailTemplate:
             </body>
         </html>
         """
+    
+    @staticmethod
+    def digest(due_books: List[Tuple[str, str]],
+               overdue_books: List[Tuple[str, str, int]]) -> str:
+        """Generate one email body listing a member's due and overdue books
+        
+        ``due_books`` holds (title, due date) pairs for books due tomorrow
+        and ``overdue_books`` (title, due date, days overdue) triples.
+        """
+        sections = []
+        if overdue_books:
+            rows = "".join(
+                f"<tr><td>{title}</td><td>{due_date}</td><td>{days_overdue}</td></tr>"
+                for title, due_date, days_overdue in overdue_books
+            )
+            sections.append(f"""
+                <h3 style="color: #F44336;">Overdue</h3>
+                <table style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; width: 100%;">
+                    <tr><th align="left">Book Title</th><th align="left">Due Date</th><th align="left">Days Overdue</th></tr>
+                    {rows}
+                </table>
+                <p>Please return these books as soon as possible to avoid accumulating late fees.</p>
+            """)
+        if due_books:
+            rows = "".join(
+                f"<tr><td>{title}</td><td>{due_date}</td></tr>"
+                for title, due_date in due_books
+            )
+            sections.append(f"""
+                <h3 style="color: #2196F3;">Due Tomorrow</h3>
+                <table style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; width: 100%;">
+                    <tr><th align="left">Book Title</th><th align="left">Due Date</th></tr>
+                    {rows}
+                </table>
+                <p>Please return these books on time to avoid any late fees.</p>
+            """)
+        return f"""
+        <html>
+            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+                <h2 style="color: #2196F3;">Library Loans Summary</h2>
+                <p>Dear Library Member,</p>
+                <p>Here is a summary of your library books that need attention:</p>
+                {"".join(sections)}
+                <p>If you have any questions, please contact the library staff.</p>
+                <hr style="border: 1px solid #eee; margin: 20px 0;">
+                <p style="color: #666; font-size: 12px;">
+                    This is an automated message. Please do not reply to this email.
+                </p>
+            </body>
+        </html>
+        """
 
 class NotificationSystem:
     def __init__(self, smtp_server: str, smtp_port: int,
-                 sender_email: str, sender_password: str):
-        """Initialize notification system with SMTP settings"""
+                 sender_email: str, sender_password: str,
+                 pool_size: int = 4, use_tls: bool = True, digest: bool = False):
+        """Initialize notification system with SMTP settings
+        
+        Mail goes out over up to ``pool_size`` reused SMTP sessions instead
+        of a new connection, STARTTLS and login per message. With
+        ``digest=True`` each member gets one email covering all their due
+        and overdue books instead of one per book.
+        """
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.sender_email = sender_email
         self.sender_password = sender_password
+        self.smtp_pool = SMTPSessionPool(smtp_server, smtp_port, sender_email, sender_password,
+                                         size=pool_size, use_tls=use_tls)
+        self.digest = digest
         self.db = None
         self.running = False
-        self.check_interval = 3600  # Check every hour
+        self.scheduler = None
     
     def set_database(self, db):
         """Set database connection"""
@@ -83,21 +146,7 @@ class NotificationSystem:
     def send_email(self, recipient: str, subject: str, body: str) -> bool:
         """Send email using SMTP"""
         try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.sender_email
-            msg['To'] = recipient
-            
-            # Attach HTML content
-            msg.attach(MIMEText(body, 'html'))
-            
-            # Connect to SMTP server
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
-            
+            self.deliver(recipient, subject, body)
             logger.info(f"Email sent successfully to {recipient}")
             return True
             
@@ -105,6 +154,20 @@ class NotificationSystem:
             logger.error(f"Failed to send email: {str(e)}")
             return False
     
+    def deliver(self, recipient: str, subject: str, body: str):
+        """Send an HTML email, raising on failure"""
+        # Create message
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.sender_email
+        msg['To'] = recipient
+        
+        # Attach HTML content
+        msg.attach(MIMEText(body, 'html'))
+        
+        # Send over a pooled, already authenticated session
+        self.smtp_pool.send_message(msg)
+    
     def send_due_reminder(self, user_id: int, book_id: int) -> bool:
         """Send due reminder email for a book"""
         try:
@@ -122,7 +185,7 @@ class NotificationSystem:
             subject = "Library Book Due Reminder"
             body = EmailTemplate.due_reminder(
                 book['title'],
-                book['due_date']
+                datetime.fromtimestamp(book['due_date']).strftime("%Y-%m-%d")
             )
             
             # Send email
@@ -146,14 +209,13 @@ class NotificationSystem:
                 raise Exception("Book or user not found")
             
             # Calculate days overdue
-            due_date = datetime.strptime(book['due_date'], "%Y-%m-%d %H:%M:%S")
-            days_overdue = (datetime.now() - due_date).days
+            days_overdue = int((time.time() - book['due_date']) // 86400)
             
             # Generate email
             subject = "Library Book Overdue Notice"
             body = EmailTemplate.overdue_notice(
                 book['title'],
-                book['due_date'],
+                datetime.fromtimestamp(book['due_date']).strftime("%Y-%m-%d"),
                 days_overdue
             )
             
@@ -164,71 +226,117 @@ class NotificationSystem:
             logger.error(f"Failed to send overdue notice: {str(e)}")
             return False
     
-    def check_and_send_reminders(self):
-        """Check for books due tomorrow and overdue books"""
+    def reminder_email(self, notice: Dict[str, Any]) -> Tuple[str, str]:
+        """Subject and body for an outbox notice (see Database.claim_notifications)"""
+        due_date = datetime.fromtimestamp(notice['due_date']).strftime("%Y-%m-%d")
+        if notice['notice'] == 'overdue':
+            return ("Library Book Overdue Notice",
+                    EmailTemplate.overdue_notice(notice['title'], due_date, notice['days_overdue']))
+        return ("Library Book Due Reminder",
+                EmailTemplate.due_reminder(notice['title'], due_date))
+    
+    def check_and_send_reminders(self, digest: Optional[bool] = None):
+        """Queue reminders for books due tomorrow and overdue books, then send them
+        
+        ``digest`` overrides the digest setting for this run.
+        """
         try:
             if not self.db:
                 raise Exception("Database connection not set")
             
-            # Get books due tomorrow
-            tomorrow = datetime.now() + timedelta(days=1)
-            tomorrow_str = tomorrow.strftime("%Y-%m-%d")
+            # Books due tomorrow (local calendar day, as epoch seconds)
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            tomorrow_start = int((today + timedelta(days=1)).timestamp())
+            tomorrow_end = int((today + timedelta(days=2)).timestamp())
             
-            cursor = self.db.conn.cursor()
-            cursor.execute('''
-                SELECT ib.book_id, ib.user_id
-                FROM issued_books ib
-                WHERE ib.return_date IS NULL
-                AND date(ib.due_date) = date(?)
-            ''', (tomorrow_str,))
+            # Only notices not already queued or sent are added
+            queued = self.db.enqueue_notifications(tomorrow_start, tomorrow_end)
+            sent, failed = self.drain_outbox(digest=self.digest if digest is None else digest)
             
-            due_tomorrow = cursor.fetchall()
+            logger.info(f"Queued {queued} notices; sent {sent}, {failed} failed")
             
-            # Send due reminders
-            for book_id, user_id in due_tomorrow:
-                self.send_due_reminder(user_id, book_id)
-            
-            # Get overdue books
-            cursor.execute('''
-                SELECT ib.book_id, ib.user_id
-                FROM issued_books ib
-                WHERE ib.return_date IS NULL
-                AND ib.due_date < datetime('now')
-            ''')
-            
-            overdue = cursor.fetchall()
-            
-            # Send overdue notices
-            for book_id, user_id in overdue:
-                self.send_overdue_notice(user_id, book_id)
-            
-            logger.info(f"Sent {len(due_tomorrow)} due reminders and {len(overdue)} overdue notices")
+            # Fold loans that fell due into the dashboard counters
+            self.db.refresh_overdue_stats()
             
         except Exception as e:
             logger.error(f"Failed to check and send reminders: {str(e)}")
     
+    def drain_outbox(self, batch_size: int = 100, digest: bool = False) -> Tuple[int, int]:
+        """Send every queued notice that is due, returning (sent, failed) notice counts
+        
+        Notices are claimed in batches, so several senders (or a sender
+        restarted mid-run) share the queue without sending a notice twice.
+        Failed sends are retried by later runs with backoff. In digest mode
+        batches are ``batch_size`` users, each sent one email.
+        """
+        sent = failed = 0
+        with ThreadPoolExecutor(self.smtp_pool.size) as executor:
+            while True:
+                notices = self.db.claim_notifications(batch_size, per_user=digest)
+                if not notices:
+                    break
+                if digest:
+                    by_user: Dict[Tuple[int, str], List[Dict[str, Any]]] = {}
+                    for notice in notices:
+                        by_user.setdefault((notice['user_id'], notice['email']), []).append(notice)
+                    results = [result
+                               for group in executor.map(self._deliver_digest, by_user.values())
+                               for result in group]
+                else:
+                    results = list(executor.map(self._deliver_notice, notices))
+                self.db.complete_notifications(results)
+                failed += sum(error is not None for _, error in results)
+                sent += sum(error is None for _, error in results)
+        return sent, failed
+    
+    def _deliver_notice(self, notice: Dict[str, Any]) -> Tuple[int, Optional[str]]:
+        """Send one outbox notice; returns (notice id, error or None)"""
+        try:
+            subject, body = self.reminder_email(notice)
+            self.deliver(notice['email'], subject, body)
+            return notice['id'], None
+        except Exception as e:
+            logger.error(f"Failed to send {notice['notice']} notice {notice['id']}: {str(e)}")
+            return notice['id'], str(e)
+    
+    def _deliver_digest(self, notices: List[Dict[str, Any]]) -> List[Tuple[int, Optional[str]]]:
+        """Send one user's outbox notices as a single digest email"""
+        if len(notices) == 1:
+            return [self._deliver_notice(notices[0])]
+        
+        def day(timestamp: int) -> str:
+            return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+        
+        notices = sorted(notices, key=lambda notice: notice['due_date'])
+        due_books = [(notice['title'], day(notice['due_date']))
+                     for notice in notices if notice['notice'] == 'due']
+        overdue_books = [(notice['title'], day(notice['due_date']), notice['days_overdue'])
+                         for notice in notices if notice['notice'] == 'overdue']
+        try:
+            subject = f"Library Loans Summary: {len(overdue_books)} overdue, {len(due_books)} due tomorrow"
+            self.deliver(notices[0]['email'], subject, EmailTemplate.digest(due_books, overdue_books))
+            return [(notice['id'], None) for notice in notices]
+        except Exception as e:
+            logger.error(f"Failed to send digest to user {notices[0]['user_id']}: {str(e)}")
+            return [(notice['id'], str(e)) for notice in notices]
+    
     def start_notification_thread(self):
-        """Start the notification checking thread"""
+        """Start the reminder scheduler thread"""
         if self.running:
             return
         
+        self.scheduler = ReminderScheduler(self)
+        self.scheduler.start()
         self.running = True
-        
-        def notification_loop():
-            while self.running:
-                try:
-                    self.check_and_send_reminders()
-                except Exception as e:
-                    logger.error(f"Error in notification loop: {str(e)}")
-                time.sleep(self.check_interval)
-        
-        thread = threading.Thread(target=notification_loop, daemon=True)
-        thread.start()
         logger.info("Notification thread started")
     
     def stop_notification_thread(self):
-        """Stop the notification checking thread"""
+        """Stop the reminder scheduler thread"""
         self.running = False
+        if self.scheduler:
+            self.scheduler.stop()
+            self.scheduler = None
+        self.smtp_pool.close()
         logger.info("Notification thread stopped")
 
 # Example usage:
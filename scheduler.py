@@ -0,0 +1,173 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from database import (NOTICE_WEEK_START, OUTBOX_RETRY_BASE_SECONDS, OVERDUE_NOTICE_PERIOD_DAYS,
+                      overdue_notice_period)
+
+logger = logging.getLogger(__name__)
+
+def next_notice_time(due_date: int, now: int) -> int:
+    """Next moment after ``now`` at which a loan owes its member a notice
+
+    Every event falls on a local midnight so that loans share sweeps: the
+    day before it is due (due tomorrow), the day after it is due (overdue)
+    and the start of each overdue notice week after that.
+    """
+    due_day = datetime.fromtimestamp(due_date).replace(hour=0, minute=0, second=0, microsecond=0)
+    reminder_at = int((due_day - timedelta(days=1)).timestamp())
+    if now < reminder_at:
+        return reminder_at
+    overdue_at = int((due_day + timedelta(days=1)).timestamp())
+    if now < overdue_at:
+        return overdue_at
+    week = overdue_notice_period(due_date, now) + 1
+    week_start = NOTICE_WEEK_START + timedelta(days=week * OVERDUE_NOTICE_PERIOD_DAYS)
+    return int(datetime.combine(week_start, datetime.min.time()).timestamp())
+
+class ReminderScheduler:
+    """Runs the reminder sweep when a loan next owes a notice
+
+    Every open loan's next notice time sits in a min-heap and the scheduler
+    thread sleeps until the earliest one, so a quiet library costs nothing
+    between events. Notice times are local midnights, so loans falling due
+    on the same day share one sweep. Issues and returns made through the same Database
+    update the heap as they commit. Failed sends wake it when their retry
+    is due, and the heap is reloaded every ``resync_interval`` seconds to
+    pick up loans changed by other processes.
+    """
+
+    def __init__(self, notifications, resync_interval: float = 6 * 3600):
+        self.notifications = notifications
+        self.db = notifications.db
+        self.resync_interval = resync_interval
+        self.sweeps = 0
+        self.running = False
+        self._heap: List[Tuple[int, int, int]] = []  # (when, issue_id, due_date)
+        self._loans: Dict[int, int] = {}  # Open loans: issue_id -> due_date
+        self._retry_at: Optional[int] = None
+        self._resync_at = 0.0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def _schedule(self, issue_id: int, due_date: int, now: int):
+        """Track an open loan and queue its next notice time; caller holds the lock"""
+        self._loans[issue_id] = due_date
+        heapq.heappush(self._heap, (next_notice_time(due_date, now), issue_id, due_date))
+
+    def load(self):
+        """Rebuild the heap from every open loan"""
+        now = int(time.time())
+        loans = dict(self.db.iter_open_loan_due_dates())
+        with self._cond:
+            self._loans = {}
+            self._heap = []
+            for issue_id, due_date in loans.items():
+                self._schedule(issue_id, due_date, now)
+            self._resync_at = time.monotonic() + self.resync_interval
+            self._cond.notify()
+
+    def loan_changed(self, event: str, loans: List[Tuple[int, Optional[int]]]):
+        """Database loan listener: add issued loans and forget returned ones"""
+        now = int(time.time())
+        with self._cond:
+            for issue_id, due_date in loans:
+                if event == 'issue':
+                    self._schedule(issue_id, due_date, now)
+                else:
+                    self._loans.pop(issue_id, None)  # Its heap entries are skipped when popped
+            if len(self._heap) > 2 * len(self._loans) + 1024:
+                self._compact(now)
+            self._cond.notify()
+
+    def _compact(self, now: int):
+        """Drop heap entries of returned loans; caller holds the lock"""
+        self._heap = [(next_notice_time(due_date, now), issue_id, due_date)
+                      for issue_id, due_date in self._loans.items()]
+        heapq.heapify(self._heap)
+
+    def _next_wake(self) -> float:
+        """Seconds until the next event; caller holds the lock"""
+        wake = self._heap[0][0] if self._heap else None
+        if self._retry_at is not None and (wake is None or self._retry_at < wake):
+            wake = self._retry_at
+        timeout = self._resync_at - time.monotonic()
+        if wake is not None:
+            timeout = min(timeout, wake - time.time())
+        return max(timeout, 0.0)
+
+    def _take_due(self, now: int) -> bool:
+        """Pop every event that has come due and requeue its loan; caller holds the lock"""
+        fired = False
+        while self._heap and self._heap[0][0] <= now:
+            _, issue_id, due_date = heapq.heappop(self._heap)
+            if self._loans.get(issue_id) != due_date:
+                continue  # Returned, or rescheduled under a new due date
+            fired = True
+            heapq.heappush(self._heap, (next_notice_time(due_date, now), issue_id, due_date))
+        if self._retry_at is not None and self._retry_at <= now:
+            self._retry_at = None
+            fired = True
+        return fired
+
+    def run(self):
+        """Scheduler loop: sweep on every event until stop() is called"""
+        fired, resync = True, False  # Catch up on anything owed while stopped
+        while self.running:
+            try:
+                if resync:
+                    self.load()
+                if fired:
+                    self.sweep()
+            except Exception as e:
+                logger.error(f"Error in reminder scheduler: {str(e)}")
+            with self._cond:
+                self._cond.wait(self._next_wake())
+                if not self.running:
+                    break
+                resync = time.monotonic() >= self._resync_at
+                fired = self._take_due(int(time.time()))
+
+    def sweep(self):
+        """Queue and send whatever notices are owed now"""
+        self.notifications.check_and_send_reminders()
+        self.sweeps += 1
+        try:
+            retry_at = self.db.get_next_notification_attempt()
+        except Exception as e:
+            logger.error(f"Failed to read outbox retry time: {str(e)}")
+            retry_at = None
+        if retry_at is not None:
+            # Notices still ready after a drain belong to another sender; don't spin on them
+            retry_at = max(retry_at, int(time.time()) + OUTBOX_RETRY_BASE_SECONDS)
+        with self._cond:
+            self._retry_at = retry_at
+
+    def start(self):
+        """Load open loans, subscribe to issues and returns and start the thread"""
+        if self.running:
+            return
+        self.load()
+        self.db.add_loan_listener(self.loan_changed)
+        self.running = True
+        self._thread = threading.Thread(target=self.run, name='reminder-scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"Reminder scheduler started with {len(self._loans)} open loans")
+
+    def stop(self):
+        """Stop the scheduler thread"""
+        self.running = False
+        self.db.remove_loan_listener(self.loan_changed)
+        with self._cond:
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def pending(self) -> int:
+        """Number of open loans being tracked"""
+        with self._cond:
+            return len(self._loans)
@@ -0,0 +1,112 @@
+import argparse
+import smtplib
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+from typing import Callable, List, Optional
+
+from smtp_pool import SMTPSessionPool
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server side that accepts and discards every message"""
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        # Stands in for the TLS handshake and AUTH round trips the sink skips
+        time.sleep(self.server.connect_latency)
+        self.reply("220 sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply("250 sink")
+            elif command == 'DATA':
+                self.reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self.reply("250 queued")
+            elif command == 'QUIT':
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")  # MAIL, RCPT, RSET, NOOP
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Local SMTP sink listening on an ephemeral port"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, connect_latency: float = 0.0):
+        super().__init__(('127.0.0.1', 0), SinkHandler)
+        self.connect_latency = connect_latency
+        self.messages = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+def make_message(i: int) -> MIMEText:
+    msg = MIMEText(f"<p>Overdue notice {i}</p>", 'html')
+    msg['Subject'] = "Library Book Overdue Notice"
+    msg['From'] = "library@example.com"
+    msg['To'] = f"member{i}@example.com"
+    return msg
+
+def send_per_message(port: int) -> Callable[[MIMEText], None]:
+    """The old send_email path: one connection per message"""
+    def send(msg: MIMEText):
+        with smtplib.SMTP('127.0.0.1', port) as server:
+            server.send_message(msg)
+    return send
+
+def run(send: Callable[[MIMEText], None], count: int, threads: int) -> float:
+    """Send ``count`` messages from ``threads`` threads; return messages per second"""
+    messages = [make_message(i) for i in range(count)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(send, messages))
+    return count / (time.perf_counter() - start)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare per-message SMTP connections with the session pool")
+    parser.add_argument('--messages', type=int, default=500, help="Messages per run (default: 500)")
+    parser.add_argument('--pool-size', type=int, default=4, help="Sessions and sending threads (default: 4)")
+    parser.add_argument('--connect-latency', type=float, default=0.05,
+                        help="Seconds the sink waits before greeting, standing in for "
+                             "STARTTLS and AUTH (default: 0.05)")
+    args = parser.parse_args(argv)
+
+    sink = SMTPSink(args.connect_latency)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    try:
+        results = []
+        for threads in (1, args.pool_size):
+            results.append((f"per-message connection, {threads} thread(s)",
+                            run(send_per_message(sink.port), args.messages, threads)))
+
+            pool = SMTPSessionPool('127.0.0.1', sink.port, size=threads, use_tls=False)
+            try:
+                rate = run(pool.send_message, args.messages, threads)
+            finally:
+                pool.close()
+            results.append((f"session pool of {threads}, {threads} thread(s)", rate))
+    finally:
+        sink.shutdown()
+        sink.server_close()
+
+    print(f"{args.messages} messages per run, {args.connect_latency * 1000:.0f} ms connect latency")
+    for label, rate in results:
+        print(f"  {label:<40} {rate:>9.1f} msg/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import smtplib
+import threading
+import time
+from email.message import Message
+from typing import Any, Dict, List, Optional
+
+def session_broken(error: Exception) -> bool:
+    """Whether an error from a send means its session can no longer be used"""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == 421  # Service closing the channel
+    if isinstance(error, smtplib.SMTPException):
+        return isinstance(error, smtplib.SMTPServerDisconnected)
+    return isinstance(error, OSError)  # Socket errors
+
+class SMTPSession:
+    """One open, authenticated SMTP connection"""
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            self.smtp.close()  # Already dropped by the server
+
+class SMTPSessionPool:
+    """Up to ``size`` reusable SMTP sessions shared by sending threads
+
+    Each session pays for the connection, STARTTLS and AUTH once and then
+    carries many messages. A session the server has dropped is replaced
+    and the message resent once. Sessions are retired after
+    ``max_messages`` messages or ``idle_timeout`` seconds unused, before
+    the server gives up on them.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, size: int = 4, use_tls: bool = True,
+                 timeout: float = 30, max_messages: int = 100, idle_timeout: float = 60):
+        """``password`` of None skips AUTH; ``timeout`` is the socket timeout in seconds"""
+        if size <= 0:
+            raise ValueError("Pool size must be positive")
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.connects = 0
+        self.reconnects = 0
+        self.messages = 0
+        self._idle: List[SMTPSession] = []  # Most recently used last
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def _connect(self) -> SMTPSession:
+        """Open and authenticate a new session"""
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            if self.password is not None:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        with self._cond:
+            self.connects += 1
+        return SMTPSession(smtp)
+
+    def _acquire(self) -> SMTPSession:
+        """Take an idle session, opening one if the pool has room"""
+        stale = []
+        try:
+            with self._cond:
+                while True:
+                    while self._idle:
+                        session = self._idle.pop()
+                        if time.monotonic() - session.last_used < self.idle_timeout:
+                            return session
+                        stale.append(session)
+                        self._open -= 1
+                    if self._open < self.size:
+                        self._open += 1
+                        break
+                    self._cond.wait()
+        finally:
+            for session in stale:
+                session.close()
+
+        try:
+            return self._connect()
+        except Exception:
+            self._discard(None)
+            raise
+
+    def _release(self, session: SMTPSession):
+        """Return a healthy session to the pool"""
+        session.last_used = time.monotonic()
+        if session.messages >= self.max_messages:
+            self._discard(session)
+            return
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    def _discard(self, session: Optional[SMTPSession]):
+        """Close a session and free its slot"""
+        if session is not None:
+            session.close()
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def send_message(self, msg: Message) -> Dict[str, Any]:
+        """Send a message on a pooled session, reconnecting once if it was dropped
+
+        Returns smtplib's dict of refused recipients.
+        """
+        session = self._acquire()
+        try:
+            try:
+                refused = session.smtp.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException) as e:
+                if not session_broken(e):
+                    raise
+                self._discard(session)
+                session = None
+                with self._cond:
+                    self.reconnects += 1
+                session = self._acquire()
+                refused = session.smtp.send_message(msg)
+        except Exception as e:
+            if session is not None:
+                if session_broken(e):
+                    self._discard(session)
+                else:
+                    self._release(session)  # e.g. a refused recipient
+            raise
+
+        session.messages += 1
+        with self._cond:
+            self.messages += 1
+        self._release(session)
+        return refused
+
+    def stats(self) -> Dict[str, int]:
+        """Sessions opened, reconnects after drops and messages sent"""
+        with self._cond:
+            return {
+                'open': self._open,
+                'idle': len(self._idle),
+                'connects': self.connects,
+                'reconnects': self.reconnects,
+                'messages': self.messages
+            }
+
+    def close(self):
+        """Close every idle session"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for session in idle:
+            session.close()
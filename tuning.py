@@ -0,0 +1,80 @@
+import os
+import sqlite3
+from typing import Any, Dict, Optional
+
+# Per-connection pragmas a profile may set, in the order they are applied
+SESSION_PRAGMAS = ('cache_size', 'mmap_size', 'temp_store', 'synchronous', 'wal_autocheckpoint')
+
+# Named SQLite tuning profiles. cache_size is negative KiB (per connection),
+# mmap_size is bytes and wal_autocheckpoint is pages; a journal_mode of None
+# leaves the database's journal mode as it is.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # Single workstation running the GUI
+    'desktop': {
+        'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'synchronous': 'NORMAL',
+        'journal_mode': 'WAL',
+        'wal_autocheckpoint': 1000
+    },
+    # Shared host serving many concurrent readers
+    'server': {
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'synchronous': 'NORMAL',
+        'journal_mode': 'WAL',
+        'wal_autocheckpoint': 4000
+    },
+    # Public catalog terminal: small cache, reads from the page map, no writes
+    'kiosk-readonly': {
+        'cache_size': -8000,
+        'mmap_size': 128 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'synchronous': 'NORMAL',
+        'journal_mode': None,
+        'wal_autocheckpoint': 1000,
+        'query_only': True
+    },
+    # Large imports on the writer: no fsync per commit and no checkpoints
+    # until the load is done. Applied temporarily via Database.tuning().
+    'bulk-load': {
+        'cache_size': -256000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'synchronous': 'OFF',
+        'journal_mode': None,
+        'wal_autocheckpoint': 0
+    }
+}
+
+DEFAULT_PROFILE = 'desktop'
+
+def resolve_profile(name: Optional[str] = None) -> str:
+    """Profile name to use: ``name``, else LIBRARY_DB_PROFILE, else the default"""
+    name = name or os.environ.get('LIBRARY_DB_PROFILE') or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown database profile '{name}' "
+                         f"(expected one of: {', '.join(PROFILES)})")
+    return name
+
+def apply_settings(conn: sqlite3.Connection, settings: Dict[str, Any]):
+    """Set the per-connection pragmas found in ``settings``"""
+    for pragma in SESSION_PRAGMAS:
+        value = settings.get(pragma)
+        if value is not None:
+            conn.execute(f'PRAGMA {pragma} = {value}')
+
+def set_journal_mode(conn: sqlite3.Connection, journal_mode: Optional[str]) -> str:
+    """Switch the main database's journal mode and return the mode in effect"""
+    if journal_mode:
+        return conn.execute(f'PRAGMA main.journal_mode = {journal_mode}').fetchone()[0]
+    return conn.execute('PRAGMA main.journal_mode').fetchone()[0]
+
+def current_settings(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Current values of every pragma a profile can set on this connection"""
+    settings = {pragma: conn.execute(f'PRAGMA {pragma}').fetchone()[0]
+                for pragma in SESSION_PRAGMAS}
+    settings['journal_mode'] = set_journal_mode(conn, None)
+    return settings